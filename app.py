@@ -1,15 +1,40 @@
-from fetch_data import GitHubDataFetcher
+import argparse
+import config
 from data_manager import DataManager
-from report_generator import ReportController
 from interactive_selector import select_repos_curses
+from metrics import METRICS
+from repo_catalog import RepoCatalog
+from sync import SyncDaemon, add_repos, create_fetcher, sync_repos
 from datetime import datetime
 
+# A `.db`/`.sqlite` path stores the data in SQLite instead of JSON.
+DATA_FILE = getattr(config, "DATA_FILE", "github_data.json")
+REPORT_TITLE = "GitHub Contribution Tracker"
+REPORT_PORT = 65244
 
-def main():
-    """Main controller for the GitHub Contribution Tracker."""
-    fetcher = GitHubDataFetcher()
-    manager = DataManager()
+# report_generator is imported where reports are built, so that syncing,
+# e.g. from cron, doesn't spend seconds loading panel, hvplot and pandas.
+# benchmarks/import_time.py checks this.
 
+
+def serve_report(port=REPORT_PORT, num_procs=None, diagnostics=None):
+    from report_generator import ReportController
+
+    if diagnostics is None:
+        diagnostics = getattr(config, "DIAGNOSTICS_TAB", False)
+    controller = ReportController(DATA_FILE, getattr(config, "MAX_RENDERED_TABS", None), diagnostics)
+    if num_procs is None:
+        num_procs = getattr(config, "REPORT_PROCESSES", 1)
+    controller.server_app(REPORT_TITLE, port, num_procs=num_procs)
+
+
+def interactive():
+    """Menu-driven controller for the GitHub Contribution Tracker."""
+    with create_fetcher() as fetcher:
+        _interactive_menu(fetcher, DataManager(DATA_FILE))
+
+
+def _interactive_menu(fetcher, manager):
     print("\nWelcome to the GitHub Contribution Tracker!")
     print("1. Fetch and update data")
     print("2. Generate report")
@@ -44,39 +69,18 @@ def main():
                     print("Invalid date format. Please use YYYY-MM-DD.")
                     return
 
-            for repo in selected_repos:
-                if start_date:
-                    # Replace start date and clear repo data
-                    print(f"Resetting start date for {repo} to {start_date} and clearing existing data...")
-                else:
-                    # Keep current start date, fetch new data
-                    start_date = manager.data["repos"][repo]["start_date"]
-                    print(f"Using current start date ({start_date}) for {repo}...")
-
-                last_pull_date = manager.data["repos"][repo]["last_pull_date"]
-                print(f"Fetching data for {repo} from {last_pull_date} to now...")
-
-                commits = fetcher.fetch_commit_data(repo, last_pull_date)
-                prs_submitted = fetcher.fetch_prs_submitted(repo)
-                pr_comments = fetcher.fetch_pr_comments(repo)
-
-
-                if not commits and not prs_submitted and not pr_comments:
-                    print(f"No changes to report for {repo} since the last update.")
-                else:
-                    manager.update_repo_data(repo, start_date, commits, prs_submitted, pr_comments)
-
-            manager.save_data()
+            sync_repos(fetcher, manager, selected_repos, start_date)
             print("Repositories updated successfully!")
 
         # Add a new repository
         elif sub_choice == "2":
-            available_repos = fetcher.get_repos()
+            catalog = RepoCatalog()
+            catalog.refresh(fetcher)
+            available_repos = catalog.names()
             new_repos = select_repos_curses(available_repos)
 
+            start_dates = {}
             for repo in new_repos:
-                manager.add_managed_repo(repo)
-
                 while True:
                     start_date = input(f"Enter the starting date for {repo} (YYYY-MM-DD): ")
                     try:
@@ -84,15 +88,9 @@ def main():
                         break
                     except ValueError:
                         print("Invalid date format. Please use YYYY-MM-DD.")
+                start_dates[repo] = start_date
 
-                print(f"Fetching data for repo: {repo} from {start_date} to now...")
-                commits = fetcher.fetch_commit_data(repo, start_date)
-                prs_submitted = fetcher.fetch_prs_submitted(repo)
-                pr_comments = fetcher.fetch_prs_submitted(repo)
-
-                manager.update_repo_data(repo, start_date, commits, prs_submitted, pr_comments)
-
-            manager.save_data()
+            add_repos(fetcher, manager, start_dates)
             print("Data updated successfully!")
 
         else:
@@ -100,8 +98,7 @@ def main():
 
     elif choice == "2":
         print("\nGenerating the report...")
-        controller = ReportController()
-        controller.server_app("GitHub Contribution Tracker", 65244)
+        serve_report()
     
     elif choice == "3":
         print("Exiting. Goodbye!")
@@ -110,5 +107,105 @@ def main():
         print("Invalid choice. Please enter 1, 2, or 3.")
 
 
+def valid_date(value):
+    """argparse type for YYYY-MM-DD dates."""
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', use YYYY-MM-DD")
+    return value
+
+
+def main(argv=None):
+    """
+    Command line entry point. Without a command the interactive menu runs;
+    the commands do the same without prompts, for cron jobs and scripts.
+    """
+    parser = argparse.ArgumentParser(description="Track your GitHub contributions.")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="write timings and counters here in the Prometheus text format when done")
+    parser.add_argument("--trace-file", metavar="PATH", help="append every timing span here as a JSON line")
+    commands = parser.add_subparsers(dest="command")
+
+    sync_parser = commands.add_parser("sync", help="fetch new activity for managed repositories")
+    sync_parser.add_argument("repos", nargs="*", help="repositories to sync (default: all managed)")
+    sync_parser.add_argument("--reset", metavar="YYYY-MM-DD", type=valid_date,
+                             help="clear the repositories' data and fetch again from this date")
+
+    add_parser = commands.add_parser("add", help="start tracking repositories")
+    add_parser.add_argument("repos", nargs="+", help="repositories to add, as owner/name")
+    add_parser.add_argument("--start", metavar="YYYY-MM-DD", type=valid_date, required=True,
+                            help="date to fetch activity from")
+
+    report_parser = commands.add_parser("report", help="serve the interactive report")
+    report_parser.add_argument("--port", type=int, default=REPORT_PORT)
+    report_parser.add_argument("--processes", type=int, default=None,
+                               help="server processes, 0 for one per CPU (default: REPORT_PROCESSES)")
+    report_parser.add_argument("--diagnostics", action="store_true", default=None,
+                               help="add a Diagnostics tab with timings and counters (default: DIAGNOSTICS_TAB)")
+
+    export_parser = commands.add_parser("export", help="export static reports")
+    export_parser.add_argument("data_files", nargs="*", help=f"data files to report on (default: {DATA_FILE})")
+    export_parser.add_argument("-o", "--output-dir", default="reports")
+    export_parser.add_argument("--format", choices=("html", "json"), default="html")
+    export_parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+
+    daemon_parser = commands.add_parser("daemon", help="keep managed repositories in sync in the background")
+    daemon_parser.add_argument("--min-interval", type=float, default=900,
+                               help="seconds between syncs of the busiest repositories")
+    daemon_parser.add_argument("--max-interval", type=float, default=86400,
+                               help="seconds between syncs of dormant repositories")
+    daemon_parser.add_argument("--batch-size", type=int, default=10, help="repositories synced together")
+    daemon_parser.add_argument("--min-budget", type=int, default=500,
+                               help="rate-limit requests to keep in reserve before starting a batch")
+
+    args = parser.parse_args(argv)
+    if args.trace_file:
+        METRICS.trace_file = args.trace_file
+
+    if args.command is None:
+        interactive()
+
+    elif args.command == "sync":
+        manager = DataManager(DATA_FILE)
+        managed_repos = [repo for repo in manager.get_managed_repos() if repo in manager.data["repos"]]
+        unknown = [repo for repo in args.repos if repo not in managed_repos]
+        if unknown:
+            parser.error(f"not managed, add them first: {', '.join(unknown)}")
+        with create_fetcher() as fetcher:
+            sync_repos(fetcher, manager, args.repos or managed_repos, args.reset)
+        print("Repositories updated successfully!")
+
+    elif args.command == "add":
+        with create_fetcher() as fetcher:
+            add_repos(fetcher, DataManager(DATA_FILE), {repo: args.start for repo in args.repos})
+        print("Data updated successfully!")
+
+    elif args.command == "report":
+        serve_report(args.port, args.processes, args.diagnostics)
+
+    elif args.command == "export":
+        from report_generator import export_reports
+
+        export_reports(args.data_files or [DATA_FILE], args.output_dir, args.format, args.workers)
+
+    elif args.command == "daemon":
+        daemon = SyncDaemon(
+            DATA_FILE,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+            batch_size=args.batch_size,
+            min_budget=args.min_budget,
+            metrics_file=args.metrics_file,
+        )
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            print("Sync daemon stopped.")
+
+    if args.metrics_file:
+        METRICS.write_prometheus(args.metrics_file)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,83 @@
+"""
+Compare the report's rollup DataFrame with the original row-dict loop over raw commits.
+
+Both start from the same data file: the original loaded every record and
+built one row per touched file; the report now reads the stored rollups.
+Run from the repository root:
+
+    python -m benchmarks.bench_dataframes --file-rows 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from report_generator.data_loader import DataLoader
+from rollup import EXTENSION_TO_LANGUAGE
+from storage import open_storage
+
+from .synthetic import generate_data, write_data
+
+
+def legacy_commits_dataframe(data_file):
+    """The original row-by-row construction, kept as the baseline."""
+    data = open_storage(data_file).load()
+    rows = []
+    for repo_name, repo_data in data["repos"].items():
+        for commit in repo_data.get("commits", []):
+            commit_date = None
+            if commit.get("date"):
+                try:
+                    commit_date = datetime.strptime(commit["date"], "%Y-%m-%dT%H:%M:%SZ")
+                except ValueError:
+                    pass
+            for fi in commit.get("file_info", []):
+                file_path = fi.get("file_path")
+                rows.append({
+                    "repo_name": repo_name,
+                    "sha": commit.get("sha"),
+                    "date": commit_date,
+                    "file_path": file_path,
+                    "file_type": file_path.split(".")[-1] if "." in file_path else "unknown",
+                })
+    df = pd.DataFrame(rows)
+    df["file_type"].apply(lambda ft: EXTENSION_TO_LANGUAGE.get(ft, ft)).value_counts()
+    return df
+
+
+def rollup_dataframe(data_file):
+    """The DataFrame the report builds from the stored rollups."""
+    loader = DataLoader(data_file, use_snapshot=False)
+    loader.get_top_languages()
+    return loader._rollup_df
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--file-rows", type=int, default=1_000_000)
+    parser.add_argument("--repos", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="github_tracker_dataframes") as workdir:
+        data_file = os.path.join(workdir, "github_data.json")
+        write_data(generate_data(args.repos, args.file_rows), data_file)
+        legacy_seconds, legacy_df = timed(legacy_commits_dataframe, data_file)
+        rollup_seconds, rollup_df = timed(rollup_dataframe, data_file)
+
+    print(f"file rows:   {len(legacy_df):,} ({len(rollup_df):,} rollup rows)")
+    print(f"legacy:      {legacy_seconds:.2f}s, {legacy_df.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+    print(f"rollup:      {rollup_seconds:.2f}s, {rollup_df.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+    print(f"speedup:     {legacy_seconds / rollup_seconds:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Check that the GraphQL and REST fetchers return the same data.
+
+Both fetchers sync the same synthetic repositories from the local mock API,
+once from scratch and once incrementally from mid-way cursors, and their
+commits, PRs and review comments are compared per repository. Small pages
+and batches make both backends paginate. Exits with status 1 on any
+difference or fetch error. Run from the repository root:
+
+    python -m benchmarks.compare_backends
+    python -m benchmarks.compare_backends --repos 50 --file-rows 10000
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import config
+from fetch_data import GitHubDataFetcher
+from graphql_fetch import GraphQLDataFetcher
+from http_cache import HTTPCache
+from rate_limit import RateLimitScheduler
+
+from .mock_github import MockGitHubServer
+from .synthetic import generate_data
+
+# Records of each entity are compared sorted by their key.
+ENTITY_KEYS = {
+    "commits": "sha",
+    "pr_submitted": "pr_id",
+    "pr_comments": "comment_id",
+}
+
+
+def fetch_all(fetcher, repo_cursors):
+    """{repo: {entity: records sorted by key}} and the fetch errors."""
+    results = {}
+    for repo, entity, records in fetcher.fetch_repos_data(repo_cursors):
+        repo_results = results.setdefault(repo, {entity: [] for entity in ENTITY_KEYS})
+        if entity is not None:
+            repo_results[entity].extend(records)
+    for repo_results in results.values():
+        for entity, key in ENTITY_KEYS.items():
+            repo_results[entity].sort(key=lambda record: record[key])
+    return results, fetcher.take_errors()
+
+
+def compare(name, rest, graphql):
+    """Print the differences between two fetch results; returns how many there are."""
+    differences = 0
+    for repo in sorted(rest.keys() | graphql.keys()):
+        for entity in ENTITY_KEYS:
+            expected = rest.get(repo, {}).get(entity)
+            actual = graphql.get(repo, {}).get(entity)
+            if expected != actual:
+                differences += 1
+                print(f"{name}: {repo} {entity} differ: REST {len(expected or [])}, GraphQL {len(actual or [])} records")
+    return differences
+
+
+def run_comparison(data, page_size=20, batch_size=3):
+    """
+    Sync `data` from the mock API through both backends, in full and incrementally.
+
+    Prints every difference and fetch error and returns how many there were.
+    """
+    runs = {
+        "full": {repo: {"commits": "2015-01-01"} for repo in data["repos"]},
+        "incremental": {
+            repo: {"commits": "2020-01-01T00:00:00Z", "pr_submitted": "2020-01-01T00:00:00Z",
+                   "pr_comments": "2020-01-01T00:00:00Z"}
+            for repo in data["repos"]
+        },
+    }
+
+    differences = 0
+    with MockGitHubServer(data, config.GITHUB_USERNAME, latency=0, max_per_page=page_size) as server, \
+            tempfile.TemporaryDirectory(prefix="github_tracker_compare") as workdir:
+        def options(name):
+            return {
+                "cache": HTTPCache(os.path.join(workdir, f"{name}.db")),
+                "scheduler": RateLimitScheduler(["compare-token"], rate=10_000, burst=10_000),
+                "api_url": server.url,
+            }
+
+        with GitHubDataFetcher(**options("rest")) as rest, GraphQLDataFetcher(
+            graphql_url=f"{server.url}/graphql", batch_size=batch_size, **options("graphql")
+        ) as graphql:
+            for name, repo_cursors in runs.items():
+                rest_results, rest_errors = fetch_all(rest, repo_cursors)
+                graphql_results, graphql_errors = fetch_all(graphql, repo_cursors)
+                for backend, errors in (("REST", rest_errors), ("GraphQL", graphql_errors)):
+                    for error in errors:
+                        differences += 1
+                        print(f"{name}: {backend} error: {error}")
+                records = sum(len(records) for repo in rest_results.values() for records in repo.values())
+                run_differences = compare(name, rest_results, graphql_results)
+                differences += run_differences
+                print(f"{name}: {len(repo_cursors)} repositories, {records} records, {run_differences} differences")
+    return differences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repos", type=int, default=20)
+    parser.add_argument("--file-rows", type=int, default=2_000, help="commit file rows of the synthetic data")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=20, help="largest page the mock serves")
+    parser.add_argument("--batch-size", type=int, default=3, help="repositories per GraphQL query")
+    args = parser.parse_args()
+
+    data = generate_data(args.repos, args.file_rows, seed=args.seed)
+    if run_comparison(data, args.page_size, args.batch_size):
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Check that the command line starts without loading the reporting stack.
+
+`import app` pulls in everything the sync, add and daemon commands need;
+panel, hvplot, holoviews, bokeh, pandas and numpy must only load when a
+report is served or exported. The import runs in fresh interpreters, and
+the check fails when one of those modules is loaded or the import takes
+longer than --max-seconds. Run from the repository root:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --max-seconds 0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPORTING_MODULES = ("panel", "hvplot", "holoviews", "bokeh", "pandas", "numpy", "pyarrow")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import {{module}}
+seconds = time.perf_counter() - start
+print(json.dumps({{{{"seconds": seconds, "loaded": [m for m in {REPORTING_MODULES!r} if m in sys.modules]}}}}))
+"""
+
+
+def measure_import(module="app"):
+    """
+    Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns the import's seconds, the reporting modules it loaded, and the
+    (cumulative microseconds, name) of every module `module` imports directly.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode:
+        raise RuntimeError(f"Importing '{module}' failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.splitlines()[-1])
+
+    # "import time: self [us] | cumulative | imported package", with nested
+    # imports indented two spaces per level and listed before their parent.
+    children, imports = [], []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == module:
+                imports = children
+            children = []
+    return result["seconds"], result["loaded"], imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app", help="module to import (default: app)")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh imports; the fastest is reported")
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail when the import takes longer")
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports of the module to list")
+    args = parser.parse_args()
+
+    runs = [measure_import(args.module) for _ in range(args.repeat)]
+    seconds, loaded, imports = min(runs, key=lambda run: run[0])
+    print(f"import {args.module}: {seconds * 1000:.1f} ms")
+    for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    if loaded:
+        print(f"Importing '{args.module}' loaded the reporting stack: {', '.join(loaded)}")
+        failed = True
+    if args.max_seconds is not None and seconds > args.max_seconds:
+        print(f"Importing '{args.module}' took longer than {args.max_seconds} s.")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
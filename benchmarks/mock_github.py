@@ -0,0 +1,380 @@
+"""
+Local mock of the GitHub REST endpoints the fetcher uses, serving a data set
+shaped like github_data.json.
+
+Responses are paginated with `Link` headers, carry `X-RateLimit-*` headers,
+honor `If-None-Match` with 304 replies and are delayed by a configurable
+latency, so GitHubDataFetcher can be measured without the network. A share
+of requests can be answered with 502s to exercise retries.
+
+`POST /graphql` answers the queries GraphQLDataFetcher sends: the user id
+lookup, aliased commit histories and PR and review-comment searches, with
+cursor pagination over the same data.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+# A top-level aliased field of a batched query, e.g. `q0: repository(`.
+_ALIASED_FIELD = re.compile(r"(\w+): (repository|search)\(")
+# A string argument, e.g. `since: "2020-01-01T00:00:00Z"`.
+_STRING_ARGUMENT = re.compile(r'(\w+): ("(?:[^"\\]|\\.)*")')
+_FIRST_ARGUMENT = re.compile(r"first: (\d+)")
+
+
+class MockGitHubServer:
+    """
+    Serves `data` as the GitHub API of user `login` on a local port.
+
+    Every token gets `rate_limit` requests per `reset_seconds` window; once
+    they are used up requests get a 403 until the window resets. Request
+    counts are kept in `stats`.
+    """
+
+    def __init__(self, data, login, latency=0.05, rate_limit=5000, reset_seconds=3600, max_per_page=100,
+                 error_rate=0.0, seed=0):
+        self.login = login
+        self.latency = latency
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.rate_limit = rate_limit
+        self.reset_seconds = reset_seconds
+        self.max_per_page = max_per_page
+        self.stats = {"requests": 0, "not_modified": 0, "rate_limited": 0, "server_errors": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        # token -> [remaining, reset epoch seconds]
+        self._budgets = {}
+        self._repos = self._build_repos(data)
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _build_repos(self, data):
+        """Turn the stored records into the API's payloads, newest first as GitHub lists them."""
+        repos = {}
+        for name, repo_data in data["repos"].items():
+            commits = sorted(repo_data.get("commits", []), key=lambda commit: commit["date"], reverse=True)
+            prs = sorted(repo_data.get("pr_submitted", []), key=lambda pr: pr["updated_at"], reverse=True)
+            comments = sorted(repo_data.get("pr_comments", []), key=lambda comment: comment["updated_at"])
+            repos[name] = {
+                "meta": {
+                    "full_name": name,
+                    "private": False,
+                    "visibility": "public",
+                    "pushed_at": commits[0]["date"] if commits else None,
+                    "archived": False,
+                },
+                "commits": [
+                    {
+                        "sha": commit["sha"],
+                        "author": {"login": self.login},
+                        "commit": {
+                            "author": {"name": commit.get("author"), "date": commit["date"]},
+                            "message": commit.get("message"),
+                        },
+                    }
+                    for commit in commits
+                ],
+                "files": {
+                    commit["sha"]: [
+                        {
+                            "filename": fi["file_path"],
+                            "status": "added" if fi["status"] == "created" else fi["status"],
+                            "additions": fi["lines_added"],
+                            "deletions": fi["lines_removed"],
+                        }
+                        for fi in commit.get("file_info", [])
+                    ]
+                    for commit in commits
+                },
+                "pulls": [
+                    {
+                        "id": pr["pr_id"],
+                        "created_at": pr["date"],
+                        "updated_at": pr["updated_at"],
+                        "title": pr["title"],
+                        "state": "open" if pr["status"] == "open" else "closed",
+                        "merged_at": pr["updated_at"] if pr["status"] == "merged" else None,
+                        "user": {"login": self.login},
+                    }
+                    for pr in prs
+                ],
+                "comments": [
+                    {
+                        "id": comment["comment_id"],
+                        "pull_request_url": f"https://api.github.com/repos/{name}/pulls/{comment['pr_id']}",
+                        "created_at": comment["date"],
+                        "updated_at": comment["updated_at"],
+                        "body": comment["comment"],
+                        "html_url": comment["pr_url"],
+                        "user": {"login": self.login},
+                    }
+                    for comment in comments
+                ],
+            }
+        return repos
+
+    def _take_budget(self, token):
+        """Count a request against `token`; returns (allowed, remaining, reset)."""
+        now = time.time()
+        with self._lock:
+            self.stats["requests"] += 1
+            budget = self._budgets.get(token)
+            if budget is None or budget[1] <= now:
+                budget = self._budgets[token] = [self.rate_limit, int(now + self.reset_seconds)]
+            if budget[0] == 0:
+                self.stats["rate_limited"] += 1
+                return False, 0, budget[1]
+            budget[0] -= 1
+            return True, budget[0], budget[1]
+
+    def _fail(self):
+        """Whether to answer the next request with a server error."""
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats["server_errors"] += 1
+        return failed
+
+    def _route(self, path, query):
+        """The full, unpaginated list or object for a request path, or None for a 404."""
+        parts = path.strip("/").split("/")
+        if parts == ["user", "repos"]:
+            repos = [repo["meta"] for repo in self._repos.values()]
+            if query.get("sort") == "pushed":
+                repos.sort(key=lambda repo: repo["pushed_at"] or "", reverse=query.get("direction") != "asc")
+            return repos
+        if len(parts) < 4 or parts[0] != "repos" or f"{parts[1]}/{parts[2]}" not in self._repos:
+            return None
+        repo = self._repos[f"{parts[1]}/{parts[2]}"]
+        rest = parts[3:]
+        if rest == ["commits"]:
+            since = query.get("since")
+            return [commit for commit in repo["commits"] if not since or commit["commit"]["author"]["date"] >= since]
+        if len(rest) == 2 and rest[0] == "commits":
+            files = repo["files"].get(rest[1])
+            return None if files is None else {"sha": rest[1], "files": files}
+        if rest == ["pulls"]:
+            return repo["pulls"]
+        if rest == ["pulls", "comments"]:
+            since = query.get("since")
+            return [comment for comment in repo["comments"] if not since or comment["updated_at"] >= since]
+        return None
+
+    def user_id(self, login):
+        return f"U_{login}"
+
+    def _graphql(self, query):
+        """Answer a GraphQL query; returns the response body."""
+        user = re.search(r"user\(login: (\"(?:[^\"\\]|\\.)*\")\)", query)
+        if user and not _ALIASED_FIELD.search(query):
+            login = json.loads(user.group(1))
+            if login != self.login:
+                return {"data": {"user": None}, "errors": [
+                    {"type": "NOT_FOUND", "path": ["user"], "message": f"Could not resolve to a User with the login of '{login}'."}
+                ]}
+            return {"data": {"user": {"id": self.user_id(login)}}}
+
+        data, errors = {}, []
+        fields = list(_ALIASED_FIELD.finditer(query))
+        for field, following in zip(fields, fields[1:] + [None]):
+            alias, kind = field.group(1), field.group(2)
+            segment = query[field.start():following.start() if following else len(query)]
+            arguments = {name: json.loads(value) for name, value in _STRING_ARGUMENT.findall(segment)}
+            first = min(int(_FIRST_ARGUMENT.search(segment).group(1)), self.max_per_page)
+            if kind == "repository":
+                repo = self._repos.get(f"{arguments['owner']}/{arguments['name']}")
+                if repo is None:
+                    data[alias] = None
+                    errors.append({"type": "NOT_FOUND", "path": [alias], "message": "Could not resolve to a Repository."})
+                    continue
+                history = self._history(repo, arguments.get("since"), arguments.get("id"))
+                data[alias] = {"defaultBranchRef": {"target": {"history": self._page(history, first, arguments.get("after"))}}}
+            else:
+                nodes = self._search(arguments["query"], arguments.get("author"), "reviews(" in segment)
+                data[alias] = self._page(nodes, first, arguments.get("after"))
+        body = {"data": data}
+        if errors:
+            body["errors"] = errors
+        return body
+
+    @staticmethod
+    def _page(nodes, first, after):
+        """One page of a connection; cursors are offsets."""
+        start = int(after or 0)
+        end = min(start + first, len(nodes))
+        return {"pageInfo": {"hasNextPage": end < len(nodes), "endCursor": str(end)}, "nodes": nodes[start:end]}
+
+    def _history(self, repo, since, author_id):
+        return [
+            {
+                "oid": commit["sha"],
+                "message": commit["commit"]["message"],
+                "authoredDate": commit["commit"]["author"]["date"],
+                "author": {"name": commit["commit"]["author"]["name"]},
+            }
+            for commit in repo["commits"]
+            if (not since or commit["commit"]["author"]["date"] >= since)
+            and self.user_id(commit["author"]["login"]) == author_id
+        ]
+
+    def _search(self, search, review_author, with_reviews):
+        """PRs matching a `repo:… is:pr author|involves:… updated:>=…` search, as PR or review-comment nodes."""
+        terms = dict(term.split(":", 1) for term in search.split())
+        repo = self._repos.get(terms.get("repo"))
+        if repo is None:
+            return []
+        updated_since = terms.get("updated", "").removeprefix(">=")
+        if not with_reviews:
+            return [
+                {
+                    "databaseId": pull["id"],
+                    "createdAt": pull["created_at"],
+                    "updatedAt": pull["updated_at"],
+                    "title": pull["title"],
+                    "state": "MERGED" if pull["merged_at"] else pull["state"].upper(),
+                    "merged": bool(pull["merged_at"]),
+                }
+                for pull in repo["pulls"]
+                if pull["user"]["login"] == terms.get("author") and pull["updated_at"] >= updated_since
+            ]
+        # Every PR's comments by the user form one review; a PR counts as updated with its latest comment.
+        comments = defaultdict(list)
+        for comment in repo["comments"]:
+            if comment["user"]["login"] == review_author:
+                comments[int(comment["pull_request_url"].rsplit("/", 1)[1])].append(comment)
+        return [
+            {
+                "number": number,
+                "reviews": {"nodes": [{"comments": {"nodes": [
+                    {
+                        "databaseId": comment["id"],
+                        "createdAt": comment["created_at"],
+                        "updatedAt": comment["updated_at"],
+                        "body": comment["body"],
+                        "url": comment["html_url"],
+                    }
+                    for comment in pr_comments
+                ]}}]},
+            }
+            for number, pr_comments in sorted(comments.items())
+            if max(comment["updated_at"] for comment in pr_comments) >= updated_since
+        ]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without this, keep-alive
+            # clients stall on delayed ACKs.
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=()):
+                self.send_response(status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.stats["bytes"] += len(body)
+
+            def _admit(self):
+                """Apply the latency, rate limit and injected errors; returns the rate-limit headers, or None once answered."""
+                if server.latency:
+                    time.sleep(server.latency)
+                allowed, remaining, reset = server._take_budget(self.headers.get("Authorization", ""))
+                limit_headers = [
+                    ("X-RateLimit-Limit", str(server.rate_limit)),
+                    ("X-RateLimit-Remaining", str(remaining)),
+                    ("X-RateLimit-Reset", str(reset)),
+                ]
+                if not allowed:
+                    body = json.dumps({"message": "API rate limit exceeded"}).encode()
+                    self._send(403, body, [("Content-Type", "application/json"), *limit_headers])
+                    return None
+
+                if server._fail():
+                    self._send(502, b"<html>Bad Gateway</html>", [("Content-Type", "text/html"), *limit_headers])
+                    return None
+                return limit_headers
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                limit_headers = self._admit()
+                if limit_headers is None:
+                    return
+                if urlsplit(self.path).path != "/graphql":
+                    self._send(404, json.dumps({"message": "Not Found"}).encode(), limit_headers)
+                    return
+                body = json.dumps(server._graphql(request.get("query", ""))).encode()
+                self._send(200, body, [("Content-Type", "application/json"), *limit_headers])
+
+            def do_GET(self):
+                limit_headers = self._admit()
+                if limit_headers is None:
+                    return
+
+                url = urlsplit(self.path)
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                payload = server._route(url.path, query)
+                if payload is None:
+                    self._send(404, json.dumps({"message": "Not Found"}).encode(), limit_headers)
+                    return
+
+                headers = [("Content-Type", "application/json"), *limit_headers]
+                if isinstance(payload, list):
+                    per_page = min(int(query.get("per_page", 30)), server.max_per_page)
+                    page = int(query.get("page", 1))
+                    last = max(1, -(-len(payload) // per_page))
+                    links = []
+                    if page < last:
+                        links.append(f'<{self._page_url(url.path, query, page + 1)}>; rel="next"')
+                        links.append(f'<{self._page_url(url.path, query, last)}>; rel="last"')
+                    if links:
+                        headers.append(("Link", ", ".join(links)))
+                    payload = payload[(page - 1) * per_page:page * per_page]
+
+                body = json.dumps(payload).encode()
+                etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.stats["not_modified"] += 1
+                    self._send(304, headers=[("ETag", etag), *limit_headers])
+                    return
+                self._send(200, body, [*headers, ("ETag", etag)])
+
+            def _page_url(self, path, query, page):
+                return f"{server.url}{path}?{urlencode({**query, 'page': page})}"
+
+        return Handler
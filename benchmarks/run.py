@@ -0,0 +1,242 @@
+"""
+Benchmark suite for storage, report queries, the report view and the fetcher.
+
+Every scale's synthetic data set (see benchmarks.synthetic) is written to a
+JSON and a SQLite data file and timed through DataManager, DataLoader and
+ReportView; the fetcher is timed against a local mock of the GitHub API.
+Results are written as JSON, and a previous run can be compared against.
+Run from the repository root:
+
+    python -m benchmarks.run --scales tiny small -o bench.json
+    python -m benchmarks.run --scales tiny small --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pandas as pd
+import panel as pn
+
+import config
+from data_manager import DataManager
+from fetch_data import GitHubDataFetcher
+from http_cache import HTTPCache
+from rate_limit import RateLimitScheduler
+from report_generator.data_loader import DataLoader
+from report_generator.report_view import ReportView
+from report_generator.snapshot import SnapshotCache
+from storage import full_changes
+
+from .mock_github import MockGitHubServer
+from .synthetic import SCALES, generate_data, generate_scale, write_data
+
+RESULTS_VERSION = 1
+
+
+def measure(func, repeat, setup=None):
+    """Time `func` `repeat` times, running `setup` untimed before each call."""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"seconds": statistics.median(timings), "min_seconds": min(timings), "repeat": repeat}
+
+
+class Suite:
+    """Collects the results of one run."""
+
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, scale, name, func, setup=None, repeat=None, **extra):
+        result = {"scale": scale, "name": name, **measure(func, repeat or self.repeat, setup), **extra}
+        self.results.append(result)
+        print(f"{scale:>8}  {name:<48} {result['seconds'] * 1000:10.1f} ms")
+        return result
+
+
+def bench_storage(suite, scale, data, data_file):
+    """Time loading and saving a data file through DataManager."""
+    backend = _backend(data_file)
+    manager = DataManager(data_file)
+    suite.run(scale, f"{backend}.load_data", manager._load_data)
+
+    def change_everything():
+        manager._changes = full_changes(manager.data)
+
+    suite.run(scale, f"{backend}.save_data.full", manager.save_data, setup=change_everything)
+
+    repo_name = next(iter(data["repos"]))
+    commit = dict(data["repos"][repo_name]["commits"][0], message="Amended")
+
+    def change_one_commit():
+        manager.update_repo_data(repo_name, "2015-01-01", [commit], [], [])
+
+    suite.run(scale, f"{backend}.save_data.one_commit", manager.save_data, setup=change_one_commit)
+
+
+def bench_loader(suite, scale, data_file):
+    """Time DataLoader construction, its indexes and every report query."""
+    backend = _backend(data_file)
+    suite.run(scale, f"{backend}.DataLoader", lambda: DataLoader(data_file, use_snapshot=False))
+    if SnapshotCache(data_file).available:
+        DataLoader(data_file)
+        suite.run(scale, f"{backend}.DataLoader.snapshot", lambda: DataLoader(data_file))
+
+    loader = DataLoader(data_file, use_snapshot=False)
+
+    def reset_index():
+        loader._date_index = None
+        loader._repo_index = None
+        loader._daily_activity = {}
+
+    suite.run(scale, f"{backend}.date_index", loader._get_date_index, setup=reset_index)
+    suite.run(scale, f"{backend}.repo_index", loader._get_repo_index, setup=reset_index)
+    repo_name = loader.repo_names[0]
+    window = (pd.Timestamp("2020-01-01"), pd.Timestamp("2021-01-01"))
+    queries = {
+        "get_overall_metrics": lambda: loader.get_overall_metrics(),
+        "get_file_type_breakdown": lambda: loader.get_file_type_breakdown(),
+        "get_repo_specific_metrics": lambda: loader.get_repo_specific_metrics(repo_name),
+        "get_file_type_breakdown_by_repo": lambda: loader.get_file_type_breakdown_by_repo(repo_name),
+        "get_top_languages": lambda: loader.get_top_languages(),
+        "get_repo_contributions_summary": lambda: loader.get_repo_contributions_summary(),
+        "get_daily_activity": lambda: loader.get_daily_activity(),
+        "get_daily_activity.repo": lambda: loader.get_daily_activity(repo_name),
+        "get_overall_metrics.window": lambda: loader.get_overall_metrics(*window),
+        "get_repo_contributions_summary.window": lambda: loader.get_repo_contributions_summary(*window),
+    }
+    loader._get_date_index()
+    loader._get_repo_index()
+    for name, query in queries.items():
+        # Daily activity is cached per repository, so every call starts cold.
+        suite.run(scale, f"{backend}.{name}", query, setup=loader._daily_activity.clear)
+    return loader
+
+
+def bench_view(suite, scale, loader):
+    """Time building the whole report view, without the per-process cache."""
+    suite.run(scale, "ReportView.build_view", lambda: ReportView(loader).build_view(), setup=pn.state.cache.clear)
+
+
+def bench_fetch(suite, repos, file_rows, latency, workers, workdir):
+    """
+    Time a first and a repeated sync of `repos` repositories from the mock API.
+
+    The repeated sync runs with the response cache of the first one, so it
+    measures revalidation: list pages come back as 304s and commit details
+    are not requested at all.
+    """
+    data = generate_data(repos, file_rows, seed=1)
+    repo_cursors = {repo: {"commits": "2015-01-01T00:00:00Z"} for repo in data["repos"]}
+    commits = sum(len(repo_data["commits"]) for repo_data in data["repos"].values())
+    scale = f"fetch{repos}"
+    with MockGitHubServer(data, config.GITHUB_USERNAME, latency=latency) as server:
+        cache = HTTPCache(os.path.join(workdir, "http_cache.db"))
+        fetcher = GitHubDataFetcher(
+            max_workers=workers,
+            cache=cache,
+            scheduler=RateLimitScheduler(["benchmark-token"], rate=10_000, burst=10_000),
+            api_url=server.url,
+        )
+        try:
+            for name in ("fetch_repos_data.cold", "fetch_repos_data.cached"):
+                before = dict(server.stats)
+                result = suite.run(scale, name, lambda: list(fetcher.fetch_repos_data(repo_cursors)), repeat=1)
+                requests = server.stats["requests"] - before["requests"]
+                result.update(
+                    requests=requests,
+                    not_modified=server.stats["not_modified"] - before["not_modified"],
+                    bytes=server.stats["bytes"] - before["bytes"],
+                    requests_per_second=requests / result["seconds"],
+                    commits_per_second=commits / result["seconds"],
+                    latency=latency,
+                    workers=workers,
+                )
+        finally:
+            fetcher.close()
+
+
+def compare(results, baseline_file, threshold):
+    """Print the change against a previous run; returns the regressions slower than `threshold`."""
+    with open(baseline_file, "r") as f:
+        baseline = {(r["scale"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = []
+    print(f"\nCompared with '{baseline_file}':")
+    for result in results:
+        before = baseline.get((result["scale"], result["name"]))
+        if not before or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        # Sub-millisecond differences are timer noise, whatever their ratio.
+        slower = result["seconds"] - before["seconds"] > 0.001
+        flag = "  REGRESSION" if ratio > threshold and slower else ""
+        print(f"{result['scale']:>8}  {result['name']:<48} {ratio:6.2f}x{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+
+def _backend(data_file):
+    return "sqlite" if data_file.endswith(".db") else "json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", nargs="+", choices=SCALES, default=["tiny", "small"])
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark; the median is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-view", action="store_true", help="don't time ReportView.build_view")
+    parser.add_argument("--fetch-repos", type=int, default=20, help="repositories synced from the mock API, 0 to skip")
+    parser.add_argument("--fetch-rows", type=int, default=2_000, help="commit file rows served by the mock API")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock API latency per request in seconds")
+    parser.add_argument("--workers", type=int, default=8, help="fetcher worker threads")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="file to write the results to")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    suite = Suite(args.repeat)
+    with tempfile.TemporaryDirectory(prefix="github_tracker_bench") as workdir:
+        for scale in args.scales:
+            data = generate_scale(scale, args.seed)
+            for extension in (".json", ".db"):
+                data_file = os.path.join(workdir, f"{scale}{extension}")
+                write_data(data, data_file)
+                bench_storage(suite, scale, data, data_file)
+                loader = bench_loader(suite, scale, data_file)
+            if not args.skip_view:
+                bench_view(suite, scale, loader)
+            del data, loader
+        if args.fetch_repos:
+            bench_fetch(suite, args.fetch_repos, args.fetch_rows, args.latency, args.workers, workdir)
+
+    regressions = compare(suite.results, args.compare, args.threshold) if args.compare else []
+    with open(args.output, "w") as f:
+        json.dump({
+            "version": RESULTS_VERSION,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pd.__version__,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "results": suite.results,
+        }, f, indent=4)
+    print(f"\nWrote {len(suite.results)} results to '{args.output}'.")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Seeded generator of synthetic GitHub tracker data, shaped like github_data.json.
+
+The same scale and seed always produce the same data, so benchmark runs are
+comparable. Run from the repository root to write a data file:
+
+    python -m benchmarks.synthetic --scale medium -o /tmp/github_data.json
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from rollup import build_rollup
+from storage import full_changes, open_storage
+
+EXTENSIONS = ["py", "js", "ts", "md", "tf", "yml", "sh", "json", "html", "css", "go", "rs"]
+
+# name -> (repositories, commit file rows)
+SCALES = {
+    "tiny": (10, 10_000),
+    "small": (100, 100_000),
+    "medium": (1_000, 500_000),
+    "large": (5_000, 2_000_000),
+}
+
+_EPOCH = datetime(2015, 1, 1)
+_SPAN_SECONDS = int((datetime(2025, 1, 1) - _EPOCH).total_seconds())
+
+
+def _timestamp(rng):
+    return (_EPOCH + timedelta(seconds=rng.randrange(_SPAN_SECONDS))).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def generate_data(repos, file_rows, files_per_commit=5, prs_per_repo=20, comments_per_pr=3, seed=0):
+    """
+    Build store-shaped data for `repos` repositories holding about `file_rows`
+    commit file rows, with submitted PRs, review comments and rollups.
+
+    Commits are spread unevenly: a few busy repositories hold most of them,
+    as in a real account.
+    """
+    rng = random.Random(seed)
+    commits_total = max(repos, file_rows // files_per_commit)
+    # Zipf-like weights, so repository sizes follow a long tail.
+    weights = [1 / (rank + 1) for rank in range(repos)]
+    scale = commits_total / sum(weights)
+    data = {"managed_repos": [], "repos": {}}
+    for r in range(repos):
+        name = f"org{r % 7}/repo{r}"
+        data["managed_repos"].append(name)
+        paths = [f"src/module{m}/file{f}.{rng.choice(EXTENSIONS)}" for m in range(20) for f in range(10)]
+        commits = []
+        for c in range(max(1, round(weights[r] * scale))):
+            commits.append({
+                "sha": f"{r:06x}{c:034x}",
+                "date": _timestamp(rng),
+                "author": "Synthetic Author",
+                "message": f"Change {c} of repo{r}",
+                "file_info": [
+                    {
+                        "file_path": rng.choice(paths),
+                        "status": rng.choice(("modified", "modified", "modified", "created", "removed")),
+                        "lines_added": rng.randint(0, 200),
+                        "lines_removed": rng.randint(0, 80),
+                    }
+                    for _ in range(files_per_commit)
+                ],
+            })
+        prs, comments = [], []
+        for p in range(prs_per_repo):
+            created = _timestamp(rng)
+            pr_id = r * 100_000 + p
+            prs.append({
+                "pr_id": pr_id,
+                "date": created,
+                "updated_at": created,
+                "title": f"PR {p}",
+                "status": rng.choice(("open", "closed", "merged")),
+            })
+            for k in range(comments_per_pr):
+                comment_id = pr_id * 100 + k
+                comments.append({
+                    "comment_id": comment_id,
+                    "pr_id": str(p),
+                    "date": created,
+                    "updated_at": created,
+                    "comment": "Looks good.",
+                    "pr_url": f"https://github.com/{name}/pull/{p}#discussion_r{comment_id}",
+                })
+        repo_data = {
+            "start_date": "2015-01-01",
+            "last_pull_date": "2025-01-01T00:00:00Z",
+            "commits": commits,
+            "pr_submitted": prs,
+            "pr_comments": comments,
+        }
+        repo_data["rollup"] = build_rollup(repo_data)
+        data["repos"][name] = repo_data
+    return data
+
+
+def generate_scale(scale, seed=0):
+    """Generate the data of one of the named SCALES."""
+    repos, file_rows = SCALES[scale]
+    return generate_data(repos, file_rows, seed=seed)
+
+
+def write_data(data, data_file):
+    """Write generated data to a JSON or SQLite data file, picked by its extension."""
+    open_storage(data_file).save(data, full_changes(data))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic GitHub tracker data file.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", default="github_data.json", help="data file to write (.json or .db)")
+    args = parser.parse_args()
+    write_data(generate_scale(args.scale, args.seed), args.output)
+    print(f"Wrote the '{args.scale}' data set to '{args.output}'.")
@@ -0,0 +1,281 @@
+import base64
+import json
+import sys
+import zlib
+from array import array
+
+
+class StringTable:
+    """
+    Interns strings: each distinct string is kept once and numbered.
+
+    Used per repository for file paths, so thousands of file records share
+    one string object per path, and stored as a list next to the records,
+    which refer to paths by number. A `frozen` table rejects new strings.
+    """
+
+    def __init__(self, strings=(), frozen=False):
+        self.strings = list(strings)
+        self.frozen = frozen
+        self._index = {string: position for position, string in enumerate(self.strings)}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def index(self, string):
+        """The number of a string, adding it if it is new; None is -1."""
+        if string is None:
+            return -1
+        position = self._index.get(string)
+        if position is None:
+            if self.frozen:
+                raise ValueError(f"unknown value {string!r}, expected one of {', '.join(self.strings)}")
+            position = self._index[string] = len(self.strings)
+            self.strings.append(string)
+        return position
+
+    def lookup(self, position):
+        return None if position < 0 else self.strings[position]
+
+
+# The file statuses GitHub reports, "added" stored as "created". One table
+# serves every repository; it is frozen, so its numbering never changes while
+# packed files refer to it, and any other status is rejected.
+STATUSES = StringTable(["modified", "created", "removed", "renamed", "copied", "changed", "unchanged"], frozen=True)
+FILE_FIELDS = ("file_path", "status", "lines_added", "lines_removed")
+# Packed file values are 32-bit signed integers, in memory and on disk.
+VALUE_TYPE = "i"
+
+
+class FileRecord:
+    """One file touched by a commit, readable like the dicts the fetcher produces."""
+
+    __slots__ = FILE_FIELDS
+
+    def __init__(self, file_path, status, lines_added, lines_removed):
+        self.file_path = file_path
+        self.status = status
+        self.lines_added = lines_added
+        self.lines_removed = lines_removed
+
+    def __getitem__(self, key):
+        if key not in FILE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in FILE_FIELDS else default
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FILE_FIELDS}
+
+    def __eq__(self, other):
+        if isinstance(other, (FileRecord, dict)):
+            return all(self.get(field) == other.get(field) for field in FILE_FIELDS)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FileRecord({self.file_path!r}, {self.status!r}, {self.lines_added!r}, {self.lines_removed!r})"
+
+
+class FileInfo:
+    """
+    The files touched by a commit, packed into one 32-bit integer array.
+
+    Each file takes four numbers: its path in the repository's path table,
+    its status in STATUSES, and its added and removed lines (-1 for None).
+    Indexing and iterating yield FileRecords, so code written against lists
+    of file dicts keeps working.
+    """
+
+    __slots__ = ("paths", "values")
+
+    def __init__(self, paths, values):
+        self.paths = paths
+        self.values = values
+
+    @classmethod
+    def from_records(cls, records, paths):
+        """Pack file dicts or FileRecords, interning their paths in `paths`."""
+        values = array(VALUE_TYPE)
+        for record in records:
+            lines_added = record.get("lines_added")
+            lines_removed = record.get("lines_removed")
+            values.extend((
+                paths.index(record.get("file_path")),
+                STATUSES.index(record.get("status")),
+                -1 if lines_added is None else lines_added,
+                -1 if lines_removed is None else lines_removed,
+            ))
+        return cls(paths, values)
+
+    def __len__(self):
+        return len(self.values) // 4
+
+    def __bool__(self):
+        return bool(self.values)
+
+    def _record(self, offset):
+        path, status, lines_added, lines_removed = self.values[offset:offset + 4]
+        return FileRecord(
+            self.paths.lookup(path),
+            STATUSES.lookup(status),
+            None if lines_added < 0 else lines_added,
+            None if lines_removed < 0 else lines_removed,
+        )
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("file index out of range")
+        return self._record(position * 4)
+
+    def __iter__(self):
+        for offset in range(0, len(self.values), 4):
+            yield self._record(offset)
+
+    def __eq__(self, other):
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return f"FileInfo({list(self)!r})"
+
+    def file_paths(self):
+        """The path of every file, without building FileRecords."""
+        lookup = self.paths.lookup
+        return [lookup(path) for path in self.values[0::4]]
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+
+def repo_paths(repo_data):
+    """The path table of a repository, created on first use."""
+    paths = repo_data.get("paths")
+    if not isinstance(paths, StringTable):
+        paths = repo_data["paths"] = StringTable(paths or ())
+    return paths
+
+
+def compact_commit(commit, paths):
+    """Return `commit` with its file_info packed into a FileInfo on `paths`."""
+    file_info = commit.get("file_info")
+    if isinstance(file_info, FileInfo) and file_info.paths is paths:
+        return commit
+    return {**commit, "file_info": FileInfo.from_records(file_info or [], paths)}
+
+
+def compact_repo(repo_data):
+    """Pack the file_info of all of a repository's commits in place."""
+    paths = repo_paths(repo_data)
+    repo_data["commits"] = [compact_commit(commit, paths) for commit in repo_data.get("commits", [])]
+    return repo_data
+
+
+def file_paths(file_info):
+    """The paths of a commit's files, from a FileInfo or a list of file dicts."""
+    if isinstance(file_info, FileInfo):
+        return file_info.file_paths()
+    return [record.get("file_path") for record in file_info]
+
+
+def status_mapping(statuses):
+    """Map the status numbers of a stored status list onto STATUSES, or None if they already match."""
+    mapping = [STATUSES.index(status) for status in statuses]
+    return None if mapping == list(range(len(mapping))) else mapping
+
+
+def remap_statuses(values, mapping):
+    """Packed file values with their statuses renumbered by a status_mapping; copied only if it isn't None."""
+    if mapping:
+        values = array(VALUE_TYPE, values)
+        values[1::4] = array(VALUE_TYPE, [-1 if status < 0 else mapping[status] for status in values[1::4]])
+    return values
+
+
+def pack_values(values):
+    """The bytes of packed file values, little-endian whatever the platform."""
+    if sys.byteorder == "big":
+        values = array(VALUE_TYPE, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def unpack_values(blob):
+    values = array(VALUE_TYPE)
+    values.frombytes(blob or b"")
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def compress_text(texts):
+    """Compress a list of strings (or None) into one base64 string."""
+    return base64.b64encode(zlib.compress(json.dumps(texts).encode(), 9)).decode("ascii")
+
+
+def decompress_text(blob):
+    return json.loads(zlib.decompress(base64.b64decode(blob)))
+
+
+def compress_message(message):
+    """A commit message as zlib bytes when that is smaller; short messages stay text."""
+    if not message:
+        return message
+    compressed = zlib.compress(message.encode(), 9)
+    return compressed if len(compressed) < len(message.encode()) else message
+
+
+def decompress_message(message):
+    return zlib.decompress(message).decode() if isinstance(message, bytes) else message
+
+
+def encode_commits(commits, paths, compress_messages=True):
+    """
+    Encode a repository's commits column-wise for the data file.
+
+    Authors are numbered like paths, each commit's files become the flat
+    numbers of its FileInfo, and the messages are zlib-compressed as a block
+    when `compress_messages` is set.
+    """
+    commits = [compact_commit(commit, paths) for commit in commits]
+    authors = StringTable()
+    encoded = {
+        "sha": [commit.get("sha") for commit in commits],
+        "date": [commit.get("date") for commit in commits],
+        "author": [authors.index(commit.get("author")) for commit in commits],
+        "authors": authors.strings,
+        "statuses": STATUSES.strings,
+        "files": [commit["file_info"].values.tolist() for commit in commits],
+    }
+    messages = [commit.get("message") for commit in commits]
+    if compress_messages:
+        encoded["message_z"] = compress_text(messages)
+    else:
+        encoded["message"] = messages
+    return encoded
+
+
+def decode_commits(encoded, paths):
+    """Rebuild commit dicts with FileInfo records from encode_commits output."""
+    messages = decompress_text(encoded["message_z"]) if "message_z" in encoded else encoded["message"]
+    authors = StringTable(encoded["authors"])
+    mapping = status_mapping(encoded["statuses"])
+    return [
+        {
+            "sha": sha,
+            "date": date,
+            "author": authors.lookup(author),
+            "message": message,
+            "file_info": FileInfo(paths, remap_statuses(array(VALUE_TYPE, files), mapping)),
+        }
+        for sha, date, author, message, files in zip(
+            encoded["sha"], encoded["date"], encoded["author"], messages, encoded["files"]
+        )
+    ]
@@ -1,31 +1,73 @@
-import os
-import json
-from datetime import datetime
+from datetime import datetime, timezone
+from compact import StringTable, compact_commit, repo_paths
+from metrics import METRICS
+from rollup import Rollup, build_rollup
+from storage import ENTITIES, comment_key, open_storage
 
 
+# How records of each entity are identified when upserting.
+RECORD_KEYS = {
+    "commits": lambda commit: commit["sha"],
+    "pr_submitted": lambda pr: pr["pr_id"],
+    "pr_comments": comment_key,
+}
+
+# The timestamp each entity's sync cursor follows.
+CURSOR_FIELDS = {
+    "commits": "date",
+    "pr_submitted": "updated_at",
+    "pr_comments": "updated_at",
+}
+
 class DataManager:
-    """Handles loading, saving, and updating local JSON data."""
+    """
+    Handles loading, saving, and updating local data.
+
+    The storage backend is picked from the data file's extension: a JSON file
+    by default, or a SQLite database for `.db`/`.sqlite` files. Each
+    repository also keeps a rollup of its records by day, file type and
+    language, updated as records are upserted, which the report reads.
+    Commits' file records are packed as they are stored (see compact.py),
+    with paths interned in a table per repository.
+    """
 
     def __init__(self, data_file="github_data.json"):
         self.data_file = data_file
+        self.storage = open_storage(data_file)
         self.data = self._load_data()
-
-    def _initialize_json(self):
-        """Initialize the JSON file if it doesn't exist."""
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, "w") as f:
-                json.dump({"managed_repos": [], "repos": {}}, f, indent=4)
+        # (repo_name, entity) -> {record key: position}, built lazily for upserts.
+        self._indexes = {}
+        # repo_name -> Rollup over the repository's stored rollup rows.
+        self._rollups = {}
+        # repo_name -> {"reset": bool, entity: [records]} written on the next save.
+        self._changes = {}
+        # repo_name -> {entity: newest cursor value} of the sync in progress.
+        self._latest = {}
+        # Repositories whose commit cursor was set to where their sync started.
+        self._pinned = set()
 
     def _load_data(self):
-        """Load the JSON file."""
-        self._initialize_json()
-        with open(self.data_file, "r") as f:
-            return json.load(f)
+        """Load the data file, creating it if it doesn't exist."""
+        with METRICS.span("data_manager_load", storage=type(self.storage).__name__) as span:
+            span["data_file"] = self.data_file
+            self.storage.initialize()
+            data = self.storage.load()
+            # Data saved before rollups existed gets them on load.
+            for repo_data in data["repos"].values():
+                if "rollup" not in repo_data:
+                    repo_data["rollup"] = build_rollup(repo_data)
+            span["repos"] = len(data["repos"])
+        return data
 
     def save_data(self):
-        """Save the current data to the JSON file."""
-        with open(self.data_file, "w") as f:
-            json.dump(self.data, f, indent=4)
+        """Save the changes since the last save to the data file."""
+        with METRICS.span("data_manager_save", storage=type(self.storage).__name__) as span:
+            span.update(data_file=self.data_file, changed_repos=len(self._changes))
+            self.storage.save(self.data, self._changes)
+        self._changes = {}
+
+    def _repo_changes(self, repo_name):
+        return self._changes.setdefault(repo_name, {"reset": False, **{entity: [] for entity in ENTITIES}})
 
     def get_managed_repos(self):
         """Get the list of managed repositories."""
@@ -39,30 +81,171 @@ class DataManager:
         else:
             print(f"'{repo_name}' is already a managed repository.")
 
-    def update_repo_data(self, repo_name, start_date, commits, prs_submitted, pr_comments):
-        """Update data for a specific repository."""
-        now = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+    def get_sync_cursors(self, repo_name):
+        """
+        Return where the next sync of a repository should resume, per entity.
+
+        Commits resume from the latest stored commit date, PRs and PR comments
+        from the latest `updated_at` seen. Repositories synced before cursors
+        existed fall back to the last pull date for commits and a full fetch
+        for the rest, which the upserts deduplicate.
+        """
+        repo_data = self.data["repos"][repo_name]
+        cursors = repo_data.get("cursors", {})
+        return {
+            "commits": cursors.get("commits") or repo_data["last_pull_date"],
+            "pr_submitted": cursors.get("pr_submitted"),
+            "pr_comments": cursors.get("pr_comments"),
+        }
+
+    def _index(self, repo_name, entity):
+        """
+        Map record keys to their position in a repository's entity list.
+
+        Built once per list and kept up to date by _upsert. Duplicates left
+        behind by older versions are dropped while building it.
+        """
+        cache_key = (repo_name, entity)
+        if cache_key not in self._indexes:
+            records = self.data["repos"][repo_name][entity]
+            key_of = RECORD_KEYS[entity]
+            index = {}
+            unique = []
+            for record in records:
+                key = key_of(record)
+                if key in index:
+                    self._rollup(repo_name).add(entity, unique[index[key]], sign=-1)
+                    unique[index[key]] = record
+                else:
+                    index[key] = len(unique)
+                    unique.append(record)
+            records[:] = unique
+            self._indexes[cache_key] = index
+        return self._indexes[cache_key]
+
+    def _rollup(self, repo_name):
+        if repo_name not in self._rollups:
+            self._rollups[repo_name] = Rollup(self.data["repos"][repo_name]["rollup"])
+        return self._rollups[repo_name]
+
+    def _upsert(self, repo_name, entity, records):
+        """Insert new records and replace existing ones with the same key; return the latest cursor value."""
+        stored = self.data["repos"][repo_name][entity]
+        index = self._index(repo_name, entity)
+        key_of = RECORD_KEYS[entity]
+        cursor_field = CURSOR_FIELDS[entity]
+        changed = self._repo_changes(repo_name)[entity]
+        rollup = self._rollup(repo_name)
+        paths = repo_paths(self.data["repos"][repo_name]) if entity == "commits" else None
+        latest = None
+        for record in records:
+            if paths is not None:
+                record = compact_commit(record, paths)
+            changed.append(record)
+            key = key_of(record)
+            if key in index:
+                rollup.add(entity, stored[index[key]], sign=-1)
+                stored[index[key]] = record
+            else:
+                index[key] = len(stored)
+                stored.append(record)
+            rollup.add(entity, record)
+            value = record.get(cursor_field) or record.get("date")
+            if value and (latest is None or value > latest):
+                latest = value
+        return latest
 
+    def start_repo_update(self, repo_name, start_date):
+        """
+        Prepare a repository for a sync whose records arrive page by page.
+
+        Creates the repository, or clears it when `start_date` changes. Its
+        commit cursor is pinned to where this sync starts, so records stored
+        by a sync that fails part-way are fetched again by the next one.
+        """
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+        # Without a commit cursor, where this sync starts becomes one until it completes.
+        repo_data = self.data["repos"].get(repo_name)
+        pinned = repo_data is None or not repo_data.get("cursors", {}).get("commits")
         # Initialize new repo data if not already present
-        if repo_name not in self.data["repos"]:            
+        if repo_name not in self.data["repos"]:
             self.data["repos"][repo_name] = {
                 "start_date": start_date,
                 "last_pull_date": now,
+                "cursors": {"commits": start_date},
                 "commits": [],
                 "pr_submitted": [],
-                "pr_comments": []
+                "pr_comments": [],
+                "rollup": [],
+                "paths": StringTable()
             }
         # Update the repository
-        else:
-            if start_date and start_date != self.data["repos"][repo_name]["start_date"]:
-                # Replace start date and clear existing data
-                self.data["repos"][repo_name]["start_date"] = start_date
-                self.data["repos"][repo_name]["commits"] = []
-                self.data["repos"][repo_name]["pr_submitted"] = []
-                self.data["repos"][repo_name]["pr_comments"] = []
-
-        # Add new data and update the last pull date
-        self.data["repos"][repo_name]["commits"].extend(commits)
-        self.data["repos"][repo_name]["pr_submitted"].extend(prs_submitted)
-        self.data["repos"][repo_name]["pr_comments"].extend(pr_comments)
-        self.data["repos"][repo_name]["last_pull_date"] = now
\ No newline at end of file
+        elif start_date and start_date != self.data["repos"][repo_name]["start_date"]:
+            # Replace start date and clear existing data
+            self.data["repos"][repo_name]["start_date"] = start_date
+            self.data["repos"][repo_name]["cursors"] = {"commits": start_date}
+            self.data["repos"][repo_name]["commits"] = []
+            self.data["repos"][repo_name]["pr_submitted"] = []
+            self.data["repos"][repo_name]["pr_comments"] = []
+            self.data["repos"][repo_name]["rollup"] = []
+            self.data["repos"][repo_name]["paths"] = StringTable()
+            for entity in ENTITIES:
+                self._indexes.pop((repo_name, entity), None)
+            self._rollups.pop(repo_name, None)
+            self._changes[repo_name] = {"reset": True, **{entity: [] for entity in ENTITIES}}
+            pinned = True
+        elif pinned:
+            cursors = self.data["repos"][repo_name].setdefault("cursors", {})
+            cursors["commits"] = self.get_sync_cursors(repo_name)["commits"]
+        self._latest[repo_name] = {}
+        if pinned:
+            self._pinned.add(repo_name)
+
+    def add_repo_records(self, repo_name, entity, records):
+        """
+        Upsert a page of a repository's records during a sync started with start_repo_update.
+
+        The newest cursor value seen is remembered, but the cursors only move
+        once finish_repo_update is told the sync completed.
+        """
+        latest = self._upsert(repo_name, entity, records)
+        pending = self._latest.setdefault(repo_name, {})
+        if latest and (not pending.get(entity) or latest > pending[entity]):
+            pending[entity] = latest
+
+    def finish_repo_update(self, repo_name, complete=True):
+        """
+        End a repository's sync and stamp its last pull date.
+
+        Only a `complete` sync advances the cursors to the newest records
+        seen; otherwise they stay put, and the next sync fetches the same
+        range again, which the upserts deduplicate.
+        """
+        latest = self._latest.pop(repo_name, {})
+        pinned = repo_name in self._pinned
+        self._pinned.discard(repo_name)
+        if complete:
+            cursors = self.data["repos"][repo_name].setdefault("cursors", {})
+            if pinned and "commits" not in latest:
+                # Without commits, the next sync resumes from this pull, as before cursors existed.
+                del cursors["commits"]
+            for entity, value in latest.items():
+                if not cursors.get(entity) or value > cursors[entity]:
+                    cursors[entity] = value
+        self.data["repos"][repo_name]["last_pull_date"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def update_repo_data(self, repo_name, start_date, commits, prs_submitted, pr_comments):
+        """
+        Update data for a specific repository.
+
+        Records are upserted by sha, pr_id and comment id, so re-fetched
+        records replace their stored copy, and the per-entity sync cursors
+        advance to the newest record seen. `commits`, `prs_submitted` and
+        `pr_comments` may be any iterables; they are consumed once, record by
+        record.
+        """
+        self.start_repo_update(repo_name, start_date)
+        for entity, records in zip(ENTITIES, (commits, prs_submitted, pr_comments)):
+            self.add_repo_records(repo_name, entity, records)
+        self.finish_repo_update(repo_name)
@@ -1,57 +1,225 @@
-import requests
+import itertools
+import queue
+import threading
 import config
+from concurrent.futures import ThreadPoolExecutor
+from http_cache import HTTPCache
+from metrics import METRICS
+from rate_limit import RateLimitScheduler
+from transport import HTTPTransport, RequestError, TransportError
 
 GITHUB_API_URL = "https://api.github.com"
-HEADERS = {"Authorization": f"token {config.GITHUB_TOKEN}"}
+HEADERS = {"Accept": "application/vnd.github+json"}
+# Several tokens multiply the available rate limit for large syncs.
+GITHUB_TOKENS = getattr(config, "GITHUB_TOKENS", [config.GITHUB_TOKEN])
+MAX_WORKERS = getattr(config, "MAX_WORKERS", 8)
+MAX_RETRIES = getattr(config, "MAX_RETRIES", 5)
+REQUESTS_PER_SECOND = getattr(config, "REQUESTS_PER_SECOND", 10)
+PER_PAGE = 100
+HTTP_CACHE_FILE = getattr(config, "HTTP_CACHE_FILE", ".github_cache.db")
+HTTP_CACHE_MAX_BYTES = getattr(config, "HTTP_CACHE_MAX_BYTES", 256 * 1024 * 1024)
 
 
 class GitHubDataFetcher:
-    """Handles GitHub API interactions."""
+    """
+    Handles GitHub API interactions.
 
-    def __init__(self):
+    Requests go through `transport`, by default an HTTPTransport with a
+    connection pool sized for both worker pools. Failed requests don't stop
+    a fetch: they are recorded as RequestErrors in `errors` and the affected
+    data comes back incomplete, so callers check take_errors() before
+    trusting a repository's results. Use it as a context manager, or call
+    close() when done, to release its threads, connections and cache.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, cache=None, scheduler=None, api_url=GITHUB_API_URL, transport=None):
+        self.api_url = api_url
         self.headers = HEADERS
+        self.max_workers = max_workers
+        self.transport = transport if transport is not None else HTTPTransport(pool_size=2 * max_workers)
+        self.errors = []
+        self._errors_lock = threading.Lock()
+        self.cache = cache if cache is not None else HTTPCache(HTTP_CACHE_FILE, HTTP_CACHE_MAX_BYTES)
+        self.scheduler = scheduler if scheduler is not None else RateLimitScheduler(
+            GITHUB_TOKENS, rate=REQUESTS_PER_SECOND
+        )
+        # Repo-level list calls and per-commit detail calls use separate pools,
+        # so a commit listing waiting on its detail calls can never starve them.
+        self._repo_pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._detail_pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self):
+        """Shut down the worker pools and close the transport and the response cache."""
+        self._repo_pool.shutdown()
+        self._detail_pool.shutdown()
+        self.cache.close()
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record_error(self, error):
+        with self._errors_lock:
+            self.errors.append(error)
+        METRICS.inc("github_errors", status=error.status or "none")
+
+    def take_errors(self, repo_name=None):
+        """Remove and return the errors recorded for a repository, or all errors when `repo_name` is None."""
+        taken, kept = [], []
+        with self._errors_lock:
+            for error in self.errors:
+                (taken if repo_name is None or error.repo == repo_name else kept).append(error)
+            self.errors = kept
+        return taken
+
+    def _get(self, url, params=None, immutable=False):
+        """
+        GET a GitHub URL through the response cache and the rate-limit scheduler.
+
+        Immutable entries are served without a request; everything else is
+        revalidated with If-None-Match/If-Modified-Since and a 304 reply is
+        answered from the cache. Limit responses are retried up to MAX_RETRIES
+        times once the scheduler's backoff has passed; server errors are
+        retried by the transport, which raises TransportError when no
+        response arrives at all.
+        """
+        key = self.cache.make_key(url, params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached_response, cached_immutable = cached
+            if cached_immutable:
+                self.cache.record(hit=True)
+                METRICS.inc("github_cache_hits", kind="immutable")
+                return cached_response
+        else:
+            cached_response = None
+
+        for attempt in range(MAX_RETRIES + 1):
+            with METRICS.span("github_rate_limit_wait"):
+                token = self.scheduler.acquire()
+            headers = {**self.headers, **token.headers, **self.cache.conditional_headers(cached_response)}
+            with METRICS.span("github_request", method="GET") as span:
+                response = self.transport.get(url, headers=headers, params=params)
+                span["url"] = url
+                self._observe(span, response)
+            if not self.scheduler.update(token, response, attempt):
+                break
+
+        if response.status_code == 304 and cached_response is not None:
+            self.cache.record(hit=True)
+            METRICS.inc("github_cache_hits", kind="revalidated")
+            return cached_response
+        self.cache.record(hit=False)
+        if response.status_code == 200:
+            self.cache.put(key, url, response, immutable=immutable)
+        return response
+
+    @staticmethod
+    def _observe(span, response):
+        """Count a GitHub response in the metrics: status, size and the rate-limit budget it reports."""
+        span.update(status=response.status_code, bytes=len(response.content))
+        METRICS.inc("github_requests", status=response.status_code)
+        METRICS.inc("github_response_bytes", len(response.content))
+        if "X-RateLimit-Remaining" in response.headers:
+            remaining = int(response.headers["X-RateLimit-Remaining"])
+            span["rate_limit_remaining"] = remaining
+            METRICS.set("github_rate_limit_remaining", remaining)
+
+    def _paginate(self, url, params=None, description="data", repo_name=None):
+        """
+        Yield the pages of a GitHub list endpoint one at a time.
+
+        Requests `per_page=100` and follows the `Link: rel=next` header until the
+        last page, so callers only ever hold a single page in memory. A failed
+        page ends the listing and is recorded as an error of `repo_name`.
+        """
+        params = {**(params or {}), "per_page": PER_PAGE}
+        while url:
+            try:
+                response = self._get(url, params)
+            except TransportError as e:
+                self._record_error(RequestError(description, url, message=str(e), repo=repo_name))
+                return
+            if response.status_code != 200:
+                self._record_error(RequestError.from_response(description, url, response, repo_name))
+                return
+            yield response.json()
+            # The next link already carries every query parameter.
+            url = response.links.get("next", {}).get("url")
+            params = None
+
+    def iter_repos(self):
+        """Yield the full names of all repositories the user has access to."""
+        for page in self._paginate(f"{self.api_url}/user/repos", description="repositories"):
+            for repo in page:
+                yield repo["full_name"]
 
     def get_repos(self):
         """Fetch all repositories the user has access to."""
-        response = requests.get(f"{GITHUB_API_URL}/user/repos", headers=self.headers)
-        if response.status_code != 200:
-            print(f"Failed to fetch repositories: {response.status_code} - {response.json().get('message')}")
-            return []
-        return [repo["full_name"] for repo in response.json()]
+        return list(self.iter_repos())
 
-    def fetch_commit_data(self, repo_name, start_date):
-        """Fetch commits authored by the user and their file information."""
-        url = f"{GITHUB_API_URL}/repos/{repo_name}/commits"
-        params = {"since": start_date}
-        response = requests.get(url, headers=self.headers, params=params)
+    def iter_repo_catalog(self, since=None):
+        """
+        Yield catalog records of the user's repositories, most recently pushed first.
 
-        if response.status_code != 200:
-            print(f"Failed to fetch commits for {repo_name}: {response.status_code} - {response.json().get('message')}")
-            return []
+        Each record holds full_name, visibility, pushed_at and archived. With
+        `since`, paging stops at the first repository last pushed before it.
+        """
+        params = {"sort": "pushed", "direction": "desc"}
+        for page in self._paginate(f"{self.api_url}/user/repos", params, description="repositories"):
+            for repo in page:
+                if since and (repo.get("pushed_at") or "") < since:
+                    return
+                yield {
+                    "full_name": repo["full_name"],
+                    "visibility": repo.get("visibility") or ("private" if repo.get("private") else "public"),
+                    "pushed_at": repo.get("pushed_at"),
+                    "archived": repo.get("archived", False),
+                }
 
-        commits = response.json()
-        result = []
-        for commit in commits:
-            if commit["author"] and commit["author"]["login"] == config.GITHUB_USERNAME:
-                commit_sha = commit["sha"]
-                file_info = self.get_file_info(repo_name, commit_sha)
+    def iter_commit_data(self, repo_name, start_date):
+        """Yield commits authored by the user and their file information, page by page."""
+        url = f"{self.api_url}/repos/{repo_name}/commits"
+        params = {"since": start_date}
 
-                result.append({
-                    "sha": commit_sha,
+        for page in self._paginate(url, params, description=f"commits for {repo_name}", repo_name=repo_name):
+            commits = [
+                commit for commit in page
+                if commit["author"] and commit["author"]["login"] == config.GITHUB_USERNAME
+            ]
+            # Detail calls overlap on the pool; map() keeps them in commit order.
+            file_infos = self._detail_pool.map(
+                lambda commit: self.get_file_info(repo_name, commit["sha"]), commits
+            )
+            for commit, file_info in zip(commits, file_infos):
+                yield {
+                    "sha": commit["sha"],
                     "date": commit["commit"]["author"]["date"],
                     "author": commit["commit"]["author"]["name"],
                     "message": commit["commit"]["message"],
                     "file_info": file_info
-                })
-        return result
-    
+                }
+
+    def fetch_commit_data(self, repo_name, start_date):
+        """Fetch commits authored by the user and their file information."""
+        return list(self.iter_commit_data(repo_name, start_date))
+
     def get_file_info(self, repo_name, commit_sha):
         """Retrieve detailed file information for a specific commit."""
-        url = f"{GITHUB_API_URL}/repos/{repo_name}/commits/{commit_sha}"
-        response = requests.get(url, headers=self.headers)
+        url = f"{self.api_url}/repos/{repo_name}/commits/{commit_sha}"
+        # A commit never changes once pushed, so its details are cached for good.
+        description = f"file details for commit {commit_sha}"
+        try:
+            response = self._get(url, immutable=True)
+        except TransportError as e:
+            self._record_error(RequestError(description, url, message=str(e), repo=repo_name))
+            return []
 
         if response.status_code != 200:
-            print(f"Failed to fetch file details for commit {commit_sha}: {response.status_code} - {response.json().get('message')}")
+            self._record_error(RequestError.from_response(description, url, response, repo_name))
             return []
 
         files = response.json().get("files", [])
@@ -68,45 +236,126 @@ class GitHubDataFetcher:
             })
         return file_info
 
-    def fetch_prs_submitted(self, repo_name):
+    def iter_prs_submitted(self, repo_name, since=None):
+        """
+        Yield PRs submitted by the authenticated user, most recently updated first.
+
+        With `since`, stops at the first PR that was last updated before it.
+        """
+        url = f"{self.api_url}/repos/{repo_name}/pulls"
+        # Fetch all PRs (open, closed, merged)
+        params = {"state": "all", "sort": "updated", "direction": "desc"}
+
+        for page in self._paginate(url, params, description=f"PRs for {repo_name}", repo_name=repo_name):
+            for pr in page:
+                if since and pr["updated_at"] < since:
+                    return
+                if pr["user"]["login"] == config.GITHUB_USERNAME:
+                    yield {
+                        "pr_id": pr["id"],
+                        "date": pr["created_at"],
+                        "updated_at": pr["updated_at"],
+                        "title": pr["title"],
+                        "status": "merged" if pr.get("merged_at") else "open" if pr["state"] == "open" else "closed"
+                    }
+
+    def fetch_prs_submitted(self, repo_name, since=None):
         """Fetch PRs submitted by the authenticated user."""
-        url = f"{GITHUB_API_URL}/repos/{repo_name}/pulls"
-        params = {"state": "all"}  # Fetch all PRs (open, closed, merged)
-        response = requests.get(url, headers=self.headers, params=params)
+        return list(self.iter_prs_submitted(repo_name, since))
 
-        if response.status_code != 200:
-            print(f"Failed to fetch PRs for {repo_name}: {response.status_code} - {response.json().get('message')}")
-            return []
+    def iter_pr_comments(self, repo_name, since=None):
+        """Yield PR comments authored by the user, optionally only those updated since `since`."""
+        url = f"{self.api_url}/repos/{repo_name}/pulls/comments"
+        params = {"sort": "updated", "direction": "asc"}
+        if since:
+            params["since"] = since
+
+        for page in self._paginate(url, params, description=f"PR comments for {repo_name}", repo_name=repo_name):
+            for comment in page:
+                if comment["user"]["login"] == config.GITHUB_USERNAME:
+                    yield {
+                        "comment_id": comment["id"],
+                        "pr_id": comment["pull_request_url"].split("/")[-1],
+                        "date": comment["created_at"],
+                        "updated_at": comment["updated_at"],
+                        "comment": comment["body"],
+                        "pr_url": comment["html_url"]
+                    }
 
-        prs = response.json()
-        return [
-            {
-                "pr_id": pr["id"],
-                "date": pr["created_at"],
-                "title": pr["title"],
-                "status": "merged" if pr.get("merged_at") else "open" if pr["state"] == "open" else "closed"
-            }
-            for pr in prs
-            if pr["user"]["login"] == config.GITHUB_USERNAME
-        ]
-
-    def fetch_pr_comments(self, repo_name):
+    def fetch_pr_comments(self, repo_name, since=None):
         """Fetch PR comments authored by the user."""
-        url = f"{GITHUB_API_URL}/repos/{repo_name}/pulls/comments"
-        response = requests.get(url, headers=self.headers)
+        return list(self.iter_pr_comments(repo_name, since))
 
-        if response.status_code != 200:
-            print(f"Failed to fetch PR comments for {repo_name}: {response.status_code} - {response.json().get('message')}")
-            return []
+    def _repo_readers(self, repo_name, cursors):
+        """The record iterators of one repository's sync, per entity."""
+        return {
+            "commits": self.iter_commit_data(repo_name, cursors["commits"]),
+            "pr_submitted": self.iter_prs_submitted(repo_name, cursors.get("pr_submitted")),
+            "pr_comments": self.iter_pr_comments(repo_name, cursors.get("pr_comments")),
+        }
+
+    def fetch_repos_data(self, repo_cursors):
+        """
+        Fetch commits, PRs and PR comments for several repositories concurrently, page by page.
+
+        `repo_cursors` maps each repository to its sync cursors, as returned by
+        DataManager.get_sync_cursors: the date commits are fetched from and the
+        `updated_at` PRs and PR comments are fetched from (None for all).
+        Yields (repo_name, entity, records) for every page of up to PER_PAGE
+        records as it arrives, entity being "commits", "pr_submitted" or
+        "pr_comments", and (repo_name, None, None) once all of a repository's
+        requests are done, when take_errors(repo_name) tells whether its data
+        is complete. At most `max_workers` repositories are fetched at a time
+        and only a few pages wait for the caller, so memory stays flat however
+        much history is fetched.
+        """
+        pages = queue.Queue(maxsize=2 * self.max_workers)
+        stopped = threading.Event()
+
+        def put(item):
+            # Gives up once the caller stopped consuming, so no worker blocks forever.
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def read(repo_name, entity, records):
+            try:
+                while not stopped.is_set():
+                    page = list(itertools.islice(records, PER_PAGE))
+                    if not page or not put((repo_name, entity, page)):
+                        return
+            finally:
+                put((repo_name, entity, None))
+
+        waiting = iter(repo_cursors.items())
+        # repo_name -> the futures of its readers, and how many of them are still reading.
+        running, unfinished = {}, {}
+
+        def start_next():
+            for repo_name, cursors in itertools.islice(waiting, 1):
+                readers = self._repo_readers(repo_name, cursors)
+                running[repo_name] = [self._repo_pool.submit(read, repo_name, *reader) for reader in readers.items()]
+                unfinished[repo_name] = len(readers)
 
-        comments = response.json()
-        return [
-            {
-                "pr_id": comment["pull_request_url"].split("/")[-1],
-                "date": comment["created_at"],
-                "comment": comment["body"],
-                "pr_url": comment["html_url"]
-            }
-            for comment in comments
-            if comment["user"]["login"] == config.GITHUB_USERNAME
-        ]
+        try:
+            for _ in range(self.max_workers):
+                start_next()
+            while running:
+                repo_name, entity, records = pages.get()
+                if records is not None:
+                    yield repo_name, entity, records
+                    continue
+                unfinished[repo_name] -= 1
+                if unfinished[repo_name]:
+                    continue
+                # Re-raise anything a reader failed with.
+                for future in running.pop(repo_name):
+                    future.result()
+                yield repo_name, None, None
+                start_next()
+        finally:
+            stopped.set()
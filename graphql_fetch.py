@@ -0,0 +1,320 @@
+import json
+import config
+from fetch_data import GitHubDataFetcher, GITHUB_API_URL, MAX_RETRIES
+from metrics import METRICS
+from transport import RequestError, TransportError
+
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_URL}/graphql"
+# How many repositories share one GraphQL query.
+GRAPHQL_BATCH_SIZE = getattr(config, "GRAPHQL_BATCH_SIZE", 10)
+
+# Doubled braces: the templates below go through str.format.
+PAGE_INFO = "pageInfo {{ hasNextPage endCursor }}"
+
+COMMITS_TEMPLATE = """
+{alias}: repository(owner: {owner}, name: {name}) {{
+  defaultBranchRef {{ target {{ ... on Commit {{
+    history(first: 100, since: {since}, author: {{id: {author_id}}}{after}) {{
+      %s
+      nodes {{ oid message authoredDate author {{ name }} }}
+    }}
+  }} }} }}
+}}""" % PAGE_INFO
+
+PRS_TEMPLATE = """
+{alias}: search(type: ISSUE, first: 100, query: {query}{after}) {{
+  %s
+  nodes {{ ... on PullRequest {{ databaseId createdAt updatedAt title state merged }} }}
+}}""" % PAGE_INFO
+
+# Review comments hang off the user's reviews; at most 100 reviews per PR and
+# 100 comments per review are read.
+COMMENTS_TEMPLATE = """
+{alias}: search(type: ISSUE, first: 50, query: {query}{after}) {{
+  %s
+  nodes {{ ... on PullRequest {{
+    number
+    reviews(first: 100, author: {login}) {{
+      nodes {{ comments(first: 100) {{ nodes {{ databaseId createdAt updatedAt body url }} }} }}
+    }}
+  }} }}
+}}""" % PAGE_INFO
+
+
+def _literal(value):
+    """Render a Python string as a GraphQL string literal."""
+    return json.dumps(value)
+
+
+def _git_timestamp(date):
+    """GraphQL wants a full ISO-8601 timestamp where REST also accepts a plain date."""
+    return f"{date}T00:00:00Z" if len(date) == 10 else date
+
+
+class _Connection:
+    """A paginated GraphQL connection: a query template plus where its results sit."""
+
+    def __init__(self, template, path, **arguments):
+        self.template = template
+        self.path = path
+        self.arguments = arguments
+        self.after = None
+
+    def render(self, alias):
+        after = f", after: {_literal(self.after)}" if self.after else ""
+        return self.template.format(alias=alias, after=after, **self.arguments)
+
+    def extract(self, result):
+        """Return the connection object within an aliased result, or None."""
+        for key in self.path:
+            if result is None:
+                return None
+            result = result.get(key)
+        return result
+
+
+class GraphQLDataFetcher(GitHubDataFetcher):
+    """
+    Fetches the same data as GitHubDataFetcher through the GitHub GraphQL API.
+
+    Commit history, authored PRs and review comments of many repositories are
+    requested in one query per round of pagination, instead of one REST call
+    per repository, list page and entity. GraphQL has no per-file commit
+    statistics, so file information still comes from the REST commit detail
+    endpoint, which the response cache serves as immutable after the first
+    sync. `graphql_url` and `api_url` can point to a local stub server.
+    """
+
+    def __init__(self, graphql_url=GITHUB_GRAPHQL_URL, batch_size=GRAPHQL_BATCH_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.graphql_url = graphql_url
+        self.batch_size = batch_size
+        self._author_id = None
+
+    def _query(self, query, alias_repos=None):
+        """
+        Run a GraphQL query and return its data, or None on failure.
+
+        `alias_repos` maps the query's aliases to their repositories, so
+        failures are recorded as errors of the repositories they affect.
+        """
+        alias_repos = alias_repos or {}
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                with METRICS.span("github_rate_limit_wait"):
+                    token = self.scheduler.acquire()
+                with METRICS.span("github_request", method="POST") as span:
+                    response = self.transport.post(
+                        self.graphql_url,
+                        headers={**self.headers, **token.headers},
+                        json={"query": query},
+                    )
+                    span["url"] = self.graphql_url
+                    self._observe(span, response)
+                if not self.scheduler.update(token, response, attempt):
+                    break
+        except TransportError as e:
+            failed = RequestError("GraphQL query", self.graphql_url, message=str(e))
+        else:
+            failed = None
+            if response.status_code != 200:
+                failed = RequestError.from_response("GraphQL query", self.graphql_url, response)
+        if failed:
+            for repo_name in set(alias_repos.values()) or [None]:
+                self._record_error(RequestError(failed.description, failed.url, failed.status, failed.message, repo_name))
+            return None
+
+        body = response.json()
+        for error in body.get("errors") or []:
+            path = error.get("path") or []
+            # Errors point at the alias they concern; others affect the whole query.
+            repos = {alias_repos[path[0]]} if path and path[0] in alias_repos else set(alias_repos.values())
+            for repo_name in repos or [None]:
+                self._record_error(RequestError(
+                    "GraphQL query", self.graphql_url, response.status_code, error.get("message"), repo_name
+                ))
+        return body.get("data")
+
+    def _get_author_id(self):
+        """
+        Look up the node id of the configured user, used to filter commit history.
+
+        Returns None when the lookup fails, which _query records as an error;
+        it is retried on the next call.
+        """
+        if self._author_id is None:
+            data = self._query(f"{{ user(login: {_literal(config.GITHUB_USERNAME)}) {{ id }} }}")
+            if data and data.get("user"):
+                self._author_id = data["user"]["id"]
+        return self._author_id
+
+    def _iter_connections(self, connections):
+        """
+        Page through many connections at once, yielding (key, nodes) for every page.
+
+        `connections` maps keys, repository names or (repository, entity)
+        pairs, to _Connection objects. Every round sends a
+        single query holding the next page of each unfinished connection, up
+        to `batch_size` repositories' worth of them.
+        """
+        pending = list(connections)
+        per_query = self.batch_size * 3
+        while pending:
+            batch, pending = pending[:per_query], pending[per_query:]
+            aliases = {f"q{index}": key for index, key in enumerate(batch)}
+            query = "{" + "".join(connections[key].render(alias) for alias, key in aliases.items()) + "\n}"
+            alias_repos = {alias: key if isinstance(key, str) else key[0] for alias, key in aliases.items()}
+            data = self._query(query, alias_repos) or {}
+
+            for alias, key in aliases.items():
+                connection = connections[key]
+                page = connection.extract(data.get(alias))
+                if not page:
+                    continue
+                if page["pageInfo"]["hasNextPage"]:
+                    connection.after = page["pageInfo"]["endCursor"]
+                    pending.append(key)
+                yield key, [node for node in page["nodes"] if node]
+
+    def _fetch_connections(self, connections):
+        """Page through many connections at once and return all nodes per key."""
+        nodes = {key: [] for key in connections}
+        for key, page in self._iter_connections(connections):
+            nodes[key].extend(page)
+        return nodes
+
+    def _commits_connection(self, repo_name, since):
+        """The commit history connection of a repository, or None without the user's id to filter it by."""
+        author_id = self._get_author_id()
+        if author_id is None:
+            # The lookup's own error says why; this one keeps the repository's data from being updated.
+            self._record_error(RequestError(
+                f"commits for {repo_name}", self.graphql_url,
+                message=f"the id of user '{config.GITHUB_USERNAME}' is unknown", repo=repo_name,
+            ))
+            return None
+        owner, name = repo_name.split("/", 1)
+        return _Connection(
+            COMMITS_TEMPLATE,
+            ("defaultBranchRef", "target", "history"),
+            owner=_literal(owner),
+            name=_literal(name),
+            since=_literal(_git_timestamp(since)),
+            author_id=_literal(author_id),
+        )
+
+    @staticmethod
+    def _search_query(repo_name, qualifier, since):
+        query = f"repo:{repo_name} is:pr {qualifier}:{config.GITHUB_USERNAME}"
+        if since:
+            query += f" updated:>={since}"
+        return _literal(query)
+
+    def _prs_connection(self, repo_name, since=None):
+        return _Connection(PRS_TEMPLATE, (), query=self._search_query(repo_name, "author", since))
+
+    def _comments_connection(self, repo_name, since=None):
+        return _Connection(
+            COMMENTS_TEMPLATE,
+            (),
+            query=self._search_query(repo_name, "involves", since),
+            login=_literal(config.GITHUB_USERNAME),
+        )
+
+    def _build_commits(self, repo_name, nodes):
+        """Combine history nodes with their REST file information, fetched concurrently."""
+        file_infos = self._detail_pool.map(lambda node: self.get_file_info(repo_name, node["oid"]), nodes)
+        return [
+            {
+                "sha": node["oid"],
+                "date": node["authoredDate"],
+                "author": node["author"]["name"] if node["author"] else None,
+                "message": node["message"],
+                "file_info": file_info
+            }
+            for node, file_info in zip(nodes, file_infos)
+        ]
+
+    @staticmethod
+    def _build_prs(nodes):
+        return [
+            {
+                "pr_id": pr["databaseId"],
+                "date": pr["createdAt"],
+                "updated_at": pr["updatedAt"],
+                "title": pr["title"],
+                "status": "merged" if pr["merged"] else "open" if pr["state"] == "OPEN" else "closed"
+            }
+            for pr in nodes
+        ]
+
+    @staticmethod
+    def _build_comments(nodes, since=None):
+        # The search matches PRs updated since the cursor; keep only the comments that were.
+        return [
+            {
+                "comment_id": comment["databaseId"],
+                "pr_id": str(pr["number"]),
+                "date": comment["createdAt"],
+                "updated_at": comment["updatedAt"],
+                "comment": comment["body"],
+                "pr_url": comment["url"]
+            }
+            for pr in nodes
+            for review in pr["reviews"]["nodes"]
+            for comment in review["comments"]["nodes"]
+            if not since or comment["updatedAt"] >= since
+        ]
+
+    def fetch_commit_data(self, repo_name, start_date):
+        """Fetch commits authored by the user and their file information."""
+        connection = self._commits_connection(repo_name, start_date)
+        if connection is None:
+            return []
+        nodes = self._fetch_connections({repo_name: connection})
+        return self._build_commits(repo_name, nodes[repo_name])
+
+    def fetch_prs_submitted(self, repo_name, since=None):
+        """Fetch PRs submitted by the authenticated user."""
+        nodes = self._fetch_connections({repo_name: self._prs_connection(repo_name, since)})
+        return self._build_prs(nodes[repo_name])
+
+    def fetch_pr_comments(self, repo_name, since=None):
+        """Fetch PR comments authored by the user."""
+        nodes = self._fetch_connections({repo_name: self._comments_connection(repo_name, since)})
+        return self._build_comments(nodes[repo_name], since)
+
+    def fetch_repos_data(self, repo_cursors):
+        """
+        Fetch commits, PRs and PR comments for several repositories in batched queries, page by page.
+
+        Yields the same (repo_name, entity, records) pages and (repo_name,
+        None, None) completions as GitHubDataFetcher.fetch_repos_data. The
+        repositories are fetched `batch_size` at a time, so that many are
+        in flight at most.
+        """
+        repos = list(repo_cursors)
+        for start in range(0, len(repos), self.batch_size):
+            batch = repos[start:start + self.batch_size]
+            connections = {}
+            for repo_name in batch:
+                cursors = repo_cursors[repo_name]
+                commits = self._commits_connection(repo_name, cursors["commits"])
+                if commits is not None:
+                    connections[(repo_name, "commits")] = commits
+                connections[(repo_name, "pr_submitted")] = self._prs_connection(repo_name, cursors.get("pr_submitted"))
+                connections[(repo_name, "pr_comments")] = self._comments_connection(
+                    repo_name, cursors.get("pr_comments")
+                )
+
+            for (repo_name, entity), nodes in self._iter_connections(connections):
+                if entity == "commits":
+                    records = self._build_commits(repo_name, nodes)
+                elif entity == "pr_submitted":
+                    records = self._build_prs(nodes)
+                else:
+                    records = self._build_comments(nodes, repo_cursors[repo_name].get("pr_comments"))
+                if records:
+                    yield repo_name, entity, records
+            for repo_name in batch:
+                yield repo_name, None, None
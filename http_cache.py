@@ -0,0 +1,180 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+
+from requests.utils import parse_header_links
+
+
+class CachedResponse:
+    """A response served from the HTTP cache, exposing the parts of requests.Response the fetcher uses."""
+
+    def __init__(self, body, headers):
+        self.status_code = 200
+        self.content = body
+        self.headers = headers
+        self.from_cache = True
+
+    def json(self):
+        return json.loads(self.content)
+
+    @property
+    def links(self):
+        """Parse the Link header the same way requests does."""
+        links = {}
+        for link in parse_header_links(self.headers.get("Link", "")):
+            links[link.get("rel") or link.get("url")] = link
+        return links
+
+
+class HTTPCache:
+    """
+    Persistent, size-bounded LRU cache for GitHub responses.
+
+    Entries are keyed by URL and query parameters and keep the ETag and
+    Last-Modified validators, so re-syncs can send conditional requests and
+    serve 304 replies locally. Entries stored as immutable (commit details)
+    are returned without any request at all.
+
+    Hits don't write to the database: an entry's access time is only
+    refreshed once it is more than TOUCH_INTERVAL seconds old, and those
+    refreshes are buffered and written in one transaction by put(), close()
+    or once TOUCH_BATCH of them are pending.
+    """
+
+    # Headers needed to revalidate an entry or keep following pagination.
+    STORED_HEADERS = ("ETag", "Last-Modified", "Link")
+    # Eviction order is only as precise as this many seconds.
+    TOUCH_INTERVAL = 60
+    TOUCH_BATCH = 256
+
+    def __init__(self, cache_file=".github_cache.db", max_bytes=256 * 1024 * 1024):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Pending access time refreshes: key -> time of the access.
+        self._touched = {}
+        self._conn = sqlite3.connect(cache_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                immutable INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(url, params=None):
+        """Build a stable cache key from a URL and its query parameters."""
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def get(self, key):
+        """Return (CachedResponse, immutable) for a key, or None, and mark it as recently used."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT headers, body, immutable, last_access FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            headers, body, immutable, last_access = row
+            now = time.time()
+            if now - last_access > self.TOUCH_INTERVAL:
+                self._touched[key] = now
+                if len(self._touched) >= self.TOUCH_BATCH:
+                    self._flush_touched()
+                    self._conn.commit()
+        return CachedResponse(zlib.decompress(body), json.loads(headers)), bool(immutable)
+
+    @staticmethod
+    def conditional_headers(cached):
+        """Request headers that revalidate a cached response."""
+        if cached is None:
+            return {}
+        headers = {}
+        if "ETag" in cached.headers:
+            headers["If-None-Match"] = cached.headers["ETag"]
+        if "Last-Modified" in cached.headers:
+            headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+        return headers
+
+    def put(self, key, url, response, immutable=False):
+        """Store a successful response, evicting least recently used entries beyond max_bytes."""
+        headers = {name: response.headers[name] for name in self.STORED_HEADERS if name in response.headers}
+        if not immutable and not headers.keys() & {"ETag", "Last-Modified"}:
+            # Nothing to revalidate with, so the entry could never be served.
+            return
+        body = zlib.compress(response.content)
+        with self._lock:
+            self._flush_touched()
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(headers), body, len(body), int(immutable), time.time()),
+            )
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _flush_touched(self):
+        """Write the pending access time refreshes; the caller commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched = {}
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+
+    def record(self, hit):
+        """Count a request as served locally (hit) or downloaded (miss)."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        """Return the hit/miss counters and current size of the cache."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self):
+        """Write the pending access times and close the underlying database."""
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
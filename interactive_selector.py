@@ -1,47 +1,142 @@
 import curses
 
+HEADER_LINES = 3
+
+
+def _fuzzy_match(query, name):
+    """Whether the characters of `query` appear in `name` in order."""
+    remaining = iter(name)
+    return all(char in remaining for char in query)
+
+
+class RepoFilter:
+    """
+    Incremental fuzzy filter over a list of repository names.
+
+    Names are lower-cased once up front. Typing a character only searches the
+    previous matches, and deleting one pops back to the matches it had, so
+    each keypress costs at most one pass over the current result. Substring
+    matches are listed before scattered ones.
+    """
+
+    def __init__(self, repos):
+        self.repos = repos
+        self._keys = [repo.lower() for repo in repos]
+        self.query = ""
+        # One list of matching positions per query prefix.
+        self._results = [list(range(len(repos)))]
+
+    @property
+    def matches(self):
+        """Positions in `repos` of the names matching the current query."""
+        return self._results[-1]
+
+    def push(self, char):
+        self.query += char
+        query = self.query.lower()
+        substring, scattered = [], []
+        for position in self._results[-1]:
+            key = self._keys[position]
+            if query in key:
+                substring.append(position)
+            elif _fuzzy_match(query, key):
+                scattered.append(position)
+        substring.sort()
+        scattered.sort()
+        self._results.append(substring + scattered)
+
+    def pop(self):
+        if self.query:
+            self.query = self.query[:-1]
+            self._results.pop()
+
+    def clear(self):
+        self.query = ""
+        del self._results[1:]
+
 
 def select_repos_curses(repos):
-    """Allow the user to select repositories interactively in the terminal using curses."""
+    """
+    Allow the user to select repositories interactively in the terminal using curses.
+
+    Only the rows that fit on screen are drawn, so long lists stay responsive.
+    Typing filters the list, SPACE toggles the highlighted repository, Ctrl+A
+    toggles all matches, PGUP/PGDN and HOME/END jump, ENTER confirms and ESC
+    clears the filter. Returns the selected repositories in their original order.
+    """
     def menu(stdscr):
         curses.curs_set(0)
+        if hasattr(curses, "set_escdelay"):
+            curses.set_escdelay(25)
+        repo_filter = RepoFilter(repos)
+        selected = set()
         current_row = 0
-        selected_repos = []
+        top_row = 0
 
         while True:
-            stdscr.clear()
-
-            # Display instructions
-            stdscr.addstr(0, 0, "Use UP/DOWN to navigate, SPACE to select, and ENTER to confirm.")
-            stdscr.addstr(1, 0, f"{'=' * 60}")
+            height, width = stdscr.getmaxyx()
+            # Rows left below the header; none on a terminal too short for it.
+            visible_rows = max(0, height - HEADER_LINES)
+            page_size = max(1, visible_rows)
+            matches = repo_filter.matches
+            current_row = max(0, min(current_row, len(matches) - 1))
+            # Scroll just enough to keep the highlighted row on screen.
+            if current_row < top_row:
+                top_row = current_row
+            elif current_row >= top_row + page_size:
+                top_row = current_row - page_size + 1
 
-            # Render the menu
-            for idx, repo in enumerate(repos):
-                if idx == current_row:
-                    stdscr.addstr(idx + 2, 0, f"> {repo}", curses.color_pair(1))
-                else:
-                    stdscr.addstr(idx + 2, 0, f"  {repo}")
+            stdscr.erase()
+            header = [
+                "Type to filter, SPACE select, Ctrl+A select all, PGUP/PGDN/HOME/END jump, ENTER confirm.",
+                f"Filter: {repo_filter.query}  ({len(matches)} of {len(repos)} shown, {len(selected)} selected)",
+                "=" * 60,
+            ]
+            for line, text in enumerate(header[:height]):
+                stdscr.addnstr(line, 0, text, width - 1)
 
-                # Mark selected repos
-                if repo in selected_repos:
-                    stdscr.addstr(idx + 2, 60, "[SELECTED]")
+            for offset, position in enumerate(matches[top_row:top_row + visible_rows]):
+                row = top_row + offset
+                mark = "[x]" if position in selected else "[ ]"
+                prefix = ">" if row == current_row else " "
+                attributes = curses.A_REVERSE if row == current_row else curses.A_NORMAL
+                stdscr.addnstr(HEADER_LINES + offset, 0, f"{prefix} {mark} {repos[position]}", width - 1, attributes)
 
             stdscr.refresh()
 
             # Handle key presses
             key = stdscr.getch()
 
-            if key == curses.KEY_UP and current_row > 0:
-                current_row -= 1
-            elif key == curses.KEY_DOWN and current_row < len(repos) - 1:
-                current_row += 1
+            if key == curses.KEY_UP:
+                current_row = max(0, current_row - 1)
+            elif key == curses.KEY_DOWN:
+                current_row = min(len(matches) - 1, current_row + 1)
+            elif key == curses.KEY_PPAGE:
+                current_row = max(0, current_row - page_size)
+            elif key == curses.KEY_NPAGE:
+                current_row = min(len(matches) - 1, current_row + page_size)
+            elif key == curses.KEY_HOME:
+                current_row = 0
+            elif key == curses.KEY_END:
+                current_row = len(matches) - 1
             elif key == ord(" "):  # Toggle selection with SPACE
-                repo = repos[current_row]
-                if repo in selected_repos:
-                    selected_repos.remove(repo)
+                if matches:
+                    selected ^= {matches[current_row]}
+            elif key == 1:  # Ctrl+A toggles every match
+                if set(matches) <= selected:
+                    selected.difference_update(matches)
                 else:
-                    selected_repos.append(repo)
-            elif key == 10:  # Enter key to confirm
-                return selected_repos
+                    selected.update(matches)
+            elif key in (10, 13, curses.KEY_ENTER):  # Enter key to confirm
+                return [repos[position] for position in sorted(selected)]
+            elif key in (curses.KEY_BACKSPACE, 8, 127):
+                repo_filter.pop()
+                current_row = top_row = 0
+            elif key == 27:  # ESC clears the filter
+                repo_filter.clear()
+                current_row = top_row = 0
+            elif 32 < key < 127:
+                repo_filter.push(chr(key))
+                current_row = top_row = 0
 
     return curses.wrapper(menu)
@@ -0,0 +1,197 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import config
+
+# Every span is appended to this JSONL file when set.
+METRICS_TRACE_FILE = getattr(config, "METRICS_TRACE_FILE", None)
+PROMETHEUS_PREFIX = "github_tracker_"
+
+
+def _prometheus_labels(labels):
+    """Render (name, value) label pairs as a Prometheus label set."""
+    if not labels:
+        return ""
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class Metrics:
+    """
+    Timing spans, counters and gauges of one process.
+
+    Spans time a block of code and are aggregated per name and labels into a
+    count, total and maximum. Labels should only take a few values; finer
+    details of a span, such as a repository or URL, go into its attributes,
+    which are kept in the trace only. The trace holds the last `trace_size`
+    spans in memory and, with a `trace_file`, appends every span to it as a
+    JSON line.
+    """
+
+    def __init__(self, trace_file=None, trace_size=1000):
+        self.trace_file = trace_file
+        self.trace = deque(maxlen=trace_size)
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        # (name, labels) -> [count, total seconds, max seconds]
+        self._spans = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Add `value` to a counter."""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge to `value`."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time the enclosed block as a span of `name`.
+
+        Yields a dict the block can fill with attributes for the trace.
+        """
+        attributes = {}
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            self._record(name, labels, started_at, time.perf_counter() - start, attributes)
+
+    def timed(self, name, **labels):
+        """Decorator timing every call of a function as a span, labelled with the function's name."""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, function=func.__name__, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _record(self, name, labels, started_at, seconds, attributes):
+        key = self._key(name, labels)
+        entry = {
+            "name": name,
+            "start": started_at,
+            "seconds": seconds,
+            "thread": threading.current_thread().name,
+            **labels,
+            **attributes,
+        }
+        with self._lock:
+            stats = self._spans.setdefault(key, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            self.trace.append(entry)
+            if self.trace_file:
+                with open(self.trace_file, "a") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+
+    def span_summary(self):
+        """One dict per span name and labels: count, total, mean and max seconds."""
+        with self._lock:
+            spans = sorted(self._spans.items())
+        return [
+            {
+                "span": name,
+                "labels": ", ".join(f"{label}={value}" for label, value in labels),
+                "count": count,
+                "total_seconds": total,
+                "mean_seconds": total / count,
+                "max_seconds": maximum,
+            }
+            for (name, labels), (count, total, maximum) in spans
+        ]
+
+    def value_summary(self):
+        """One dict per counter and gauge with its current value."""
+        with self._lock:
+            values = [("counter", key, value) for key, value in self._counters.items()]
+            values += [("gauge", key, value) for key, value in self._gauges.items()]
+        return [
+            {"metric": name, "type": kind, "labels": ", ".join(f"{label}={value}" for label, value in labels), "value": value}
+            for kind, (name, labels), value in sorted(values, key=lambda item: item[1])
+        ]
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            spans = sorted(self._spans.items())
+
+        lines = []
+        declared = set()
+
+        def declare(metric, kind):
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in counters:
+            metric = f"{PROMETHEUS_PREFIX}{name}_total"
+            declare(metric, "counter")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        for (name, labels), value in gauges:
+            metric = f"{PROMETHEUS_PREFIX}{name}"
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+        for (name, labels), (count, total, maximum) in spans:
+            metric = f"{PROMETHEUS_PREFIX}{name}_seconds"
+            declare(metric, "summary")
+            lines.append(f"{metric}_count{_prometheus_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total:.6f}")
+        for (name, labels), (count, total, maximum) in spans:
+            metric = f"{PROMETHEUS_PREFIX}{name}_seconds_max"
+            declare(metric, "gauge")
+            lines.append(f"{metric}{_prometheus_labels(labels)} {maximum:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text to `path`, swapped in whole for textfile collectors."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def trace_jsonl(self):
+        """The spans held in memory, one JSON object per line."""
+        with self._lock:
+            trace = list(self.trace)
+        return "".join(json.dumps(entry, default=str) + "\n" for entry in trace)
+
+    def reset(self):
+        """Forget all metrics and the in-memory trace."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._spans.clear()
+            self.trace.clear()
+
+
+# The metrics of this process, shared by every instrumented module.
+METRICS = Metrics(METRICS_TRACE_FILE)
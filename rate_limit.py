@@ -0,0 +1,139 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Paces calls to `rate` per second while allowing bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait before using it."""
+        self._refill()
+        self._tokens -= 1
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class TokenState:
+    """Budget bookkeeping for a single personal access token."""
+
+    def __init__(self, token, rate, burst):
+        self.token = token
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.blocked_until = 0.0
+
+    @property
+    def headers(self):
+        return {"Authorization": f"token {self.token}"}
+
+
+class RateLimitScheduler:
+    """
+    Spreads GitHub requests over a pool of tokens and honors the API's rate limits.
+
+    Every token has its own token bucket that caps the request rate to stay
+    clear of secondary limits. The `X-RateLimit-*` headers of each response keep
+    track of the remaining budget: below `low_water` of the limit the bucket
+    slows down to make the budget last until the reset, and an exhausted token
+    is parked until its reset time. Limit responses (403/429) park the token for
+    `Retry-After` seconds, or with exponential backoff, and ask for a retry.
+    """
+
+    SECONDARY_BACKOFF = 60
+
+    def __init__(self, tokens, rate=10.0, burst=20, low_water=0.1):
+        if not tokens:
+            raise ValueError("At least one GitHub token is required.")
+        self.max_rate = rate
+        self.low_water = low_water
+        self._states = [TokenState(token, rate, burst) for token in tokens]
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent and return the TokenState to send it with."""
+        while True:
+            with self._lock:
+                now = time.time()
+                available = [state for state in self._states if state.blocked_until <= now]
+                if available:
+                    # Prefer the token with the most budget left (unknown counts as full).
+                    state = max(
+                        available,
+                        key=lambda s: float("inf") if s.remaining is None else s.remaining,
+                    )
+                    if state.remaining is not None:
+                        state.remaining -= 1
+                    wait = state.bucket.reserve()
+                    break
+                wait = min(state.blocked_until for state in self._states) - now
+            time.sleep(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return state
+
+    def update(self, state, response, attempt=0):
+        """
+        Record the rate-limit headers of a response sent with `state`.
+
+        Returns True when the response was a limit response and the request
+        should be retried.
+        """
+        headers = response.headers
+        now = time.time()
+        with self._lock:
+            if "X-RateLimit-Remaining" in headers:
+                state.remaining = int(headers["X-RateLimit-Remaining"])
+                state.limit = int(headers.get("X-RateLimit-Limit", state.limit or 0)) or None
+                state.reset = float(headers.get("X-RateLimit-Reset", state.reset))
+                self._pace(state, now)
+
+            if response.status_code not in (403, 429):
+                return False
+
+            if "Retry-After" in headers:
+                state.blocked_until = now + float(headers["Retry-After"])
+            elif state.remaining == 0:
+                state.blocked_until = state.reset
+            elif response.status_code == 429 or "rate limit" in response.text.lower():
+                # Secondary limit without a hint: wait a minute, doubling per attempt.
+                state.blocked_until = now + self.SECONDARY_BACKOFF * 2 ** attempt
+            else:
+                # A plain permission error, not a limit.
+                return False
+            return True
+
+    def _pace(self, state, now):
+        """Slow a token down when its budget runs low so it lasts until the reset."""
+        if state.remaining == 0:
+            state.blocked_until = max(state.blocked_until, state.reset)
+            return
+        if state.limit and state.remaining < state.limit * self.low_water:
+            seconds_left = max(state.reset - now, 1.0)
+            state.bucket.rate = min(self.max_rate, state.remaining / seconds_left)
+        else:
+            state.bucket.rate = self.max_rate
+
+    def budget(self):
+        """Return the known remaining requests summed over all tokens."""
+        with self._lock:
+            return sum(state.remaining for state in self._states if state.remaining is not None)
+
+    def next_reset(self):
+        """Return the epoch time of the earliest known budget reset, or None before any response."""
+        with self._lock:
+            resets = [state.reset for state in self._states if state.remaining is not None]
+            return min(resets) if resets else None
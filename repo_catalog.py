@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import config
+
+REPO_CATALOG_FILE = getattr(config, "REPO_CATALOG_FILE", ".github_repos.json")
+# Incremental refreshes miss deleted repositories and visibility changes, so
+# the catalog is rebuilt in full once it is this old.
+REPO_CATALOG_MAX_AGE_DAYS = getattr(config, "REPO_CATALOG_MAX_AGE_DAYS", 7)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class RepoCatalog:
+    """
+    Local catalog of the repositories the user has access to.
+
+    Keeps full name, visibility, last push and archived flag per repository.
+    The first refresh pages through all repositories; later ones only fetch
+    repositories pushed since the newest push already known, most recent
+    first, so an unchanged catalog costs a single revalidated request.
+    """
+
+    def __init__(self, catalog_file=REPO_CATALOG_FILE, max_age_days=REPO_CATALOG_MAX_AGE_DAYS):
+        self.catalog_file = catalog_file
+        self.max_age = timedelta(days=max_age_days)
+        self.repos = {}
+        self.built_at = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.catalog_file):
+            return
+        with open(self.catalog_file, "r") as f:
+            catalog = json.load(f)
+        self.repos = catalog["repos"]
+        self.built_at = catalog["built_at"]
+
+    def save(self):
+        """Write the catalog next to its target and swap it in."""
+        directory = os.path.dirname(os.path.abspath(self.catalog_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"built_at": self.built_at, "repos": self.repos}, f)
+            os.replace(tmp_path, self.catalog_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _is_stale(self):
+        if self.built_at is None:
+            return True
+        built_at = datetime.strptime(self.built_at, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - built_at > self.max_age
+
+    def latest_push(self):
+        """The newest pushed_at in the catalog, or None when it is empty."""
+        return max((repo["pushed_at"] for repo in self.repos.values() if repo["pushed_at"]), default=None)
+
+    def refresh(self, fetcher, full=False):
+        """
+        Bring the catalog up to date from GitHub and save it.
+
+        Rebuilds it from scratch when `full` is set, on first use and once it
+        is older than the maximum age; otherwise fetches only repositories
+        pushed since the latest known push. Returns the names of the
+        repositories that were added or updated.
+        """
+        full = full or self._is_stale()
+        since = None if full else self.latest_push()
+        started = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+        records = {record.pop("full_name"): record for record in fetcher.iter_repo_catalog(since)}
+        errors = fetcher.take_errors()
+        if errors:
+            # A partial listing would drop repositories, so the catalog stays as it is.
+            for error in errors:
+                print(error)
+            return []
+        changed = [name for name, record in records.items() if self.repos.get(name) != record]
+        if full:
+            self.repos = records
+            self.built_at = started
+        else:
+            self.repos.update(records)
+        self.save()
+        return changed
+
+    def names(self, include_archived=True):
+        """Repository names, most recently pushed first."""
+        return sorted(
+            (name for name, repo in self.repos.items() if include_archived or not repo["archived"]),
+            key=lambda name: self.repos[name]["pushed_at"] or "",
+            reverse=True,
+        )
+
+    def get(self, repo_name):
+        """The catalog record of a repository, or None if it is not known."""
+        return self.repos.get(repo_name)
@@ -1,6 +1,26 @@
 # This __init__.py file marks the directory as a package.
-# It can also be used to import the key components of the report generator.
+# It also exposes the key components of the report generator, imported on
+# first access (PEP 562): they pull in panel, hvplot and pandas, which
+# importing the package, as the command line does, shouldn't.
+import importlib
 
-from .data_loader import DataLoader
-from .report_view import ReportView
-from .report_controller import ReportController
+_EXPORTS = {
+    "DataLoader": ".data_loader",
+    "ReportView": ".report_view",
+    "ReportController": ".report_controller",
+    "export_report": ".exporter",
+    "export_reports": ".exporter",
+}
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
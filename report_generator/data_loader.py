@@ -1,211 +1,412 @@
 # data_loader.py
-import json
-import os
+import numpy as np
 import pandas as pd
-from datetime import datetime
+import threading
+from pandas.api.types import union_categoricals
+from metrics import METRICS
+from rollup import MEASURES, ROLLUP_COLUMNS
+from storage import open_storage
+from .snapshot import SnapshotCache, stat_fingerprint
 
 
-EXTENSION_TO_LANGUAGE = {
-    "py": "Python",
-    "tf": "Terraform",
-    "js": "JavaScript",
-    "md": "Markdown",
-    "ts": "TypeScript",
-    "yml": "yaml",
-    "sh": "Shell Script"
-}
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# Bumped whenever the DataFrame layout changes, so older snapshots are rebuilt.
+FRAMES_VERSION = 6
+
+
+def _parse_dates(values):
+    """Parse GitHub timestamps in bulk; missing or malformed ones become NaT."""
+    try:
+        # numpy parses the ISO form GitHub returns (minus its trailing "Z") in C.
+        return pd.DatetimeIndex(np.array(
+            [value[:-1] if value and value[-1] == "Z" else "NaT" for value in values], dtype="datetime64[s]"
+        ))
+    except ValueError:
+        return pd.DatetimeIndex(pd.to_datetime(pd.Series(values, dtype=object), format=DATE_FORMAT, errors="coerce"))
+
+
+def _code_counts(codes, weights, categories):
+    """Sums of `weights` per category of categorical codes as a dict, largest first; -1 counts as NaN."""
+    present = codes >= 0
+    sums = np.bincount(codes[present], weights=weights[present], minlength=len(categories)).astype(np.int64)
+    result = {categories[code]: int(sums[code]) for code in np.argsort(-sums, kind="stable") if sums[code]}
+    missing = int(weights[~present].sum())
+    if missing:
+        result[np.nan] = missing
+    return result
+
+
+class DateIndex:
+    """
+    The rows of a DataFrame ordered by date, for time-window queries.
+
+    Keeps the sorted dates next to the categorical codes and measures of the
+    given columns in the same order, so the rows of a window are found with
+    two binary searches and aggregated over that slice only. Rows without a
+    date sort last and only count when no window is set.
+
+    With a `group_column`, the rows are ordered by its categorical code
+    first, so each group, e.g. a repository, is one contiguous date-sorted
+    segment found by its code, and a query for one group only touches its
+    own rows. Running totals make the sum of a measure over any slice a
+    single subtraction.
+    """
+
+    def __init__(self, frame, date_column, columns, measures, group_column=None):
+        dates = frame[date_column].to_numpy()
+        if group_column is None:
+            order = np.argsort(dates, kind="stable")
+        else:
+            groups = np.asarray(frame[group_column].cat.codes)
+            order = np.lexsort((dates, groups))
+        self.dates = dates[order]
+        self.dated = len(dates) - int(np.isnat(dates).sum())
+        self.codes = {column: np.asarray(frame[column].cat.codes)[order] for column in columns}
+        self.categories = {column: frame[column].cat.categories for column in columns}
+        self.values = {measure: frame[measure].to_numpy()[order] for measure in measures}
+        self.sums = {
+            measure: np.concatenate(([0], np.cumsum(values, dtype=np.int64)))
+            for measure, values in self.values.items()
+            if values.dtype.kind in "iu"
+        }
+        if group_column is not None:
+            group_count = len(frame[group_column].cat.categories)
+            sorted_groups = groups[order]
+            # Group g holds the rows [offsets[g], offsets[g + 1]), the dated ones up to dated_ends[g].
+            self.offsets = np.searchsorted(sorted_groups, np.arange(group_count + 1))
+            undated = np.bincount(sorted_groups[np.isnat(self.dates)], minlength=group_count)
+            self.dated_ends = self.offsets[1:] - undated
+
+    def _segment(self, group):
+        """The first row, the end of the dated rows and the end of all rows of a group, or of the whole index."""
+        if group is None:
+            return 0, self.dated, len(self.dates)
+        return int(self.offsets[group]), int(self.dated_ends[group]), int(self.offsets[group + 1])
+
+    def window(self, start=None, end=None, group=None):
+        """
+        The positions of the rows dated in [start, end) as a slice; all rows without bounds.
+
+        With a `group` code, only that group's rows, which needs a grouped index.
+        """
+        first, dated_end, last = self._segment(group)
+        if start is None and end is None:
+            return slice(first, last)
+        dates = self.dates[first:dated_end]
+        lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), "left"))
+        return slice(first + lo, first + max(lo, hi))
+
+    def dated_rows(self, group=None):
+        """The positions of all dated rows, of one group or of the whole index, as a slice."""
+        first, dated_end, _ = self._segment(group)
+        return slice(first, dated_end)
+
+    def total(self, measure, rows):
+        """The sum of a measure over a slice of rows."""
+        return int(self.sums[measure][rows.stop] - self.sums[measure][rows.start])
+
+    def counts(self, column, measure, rows):
+        """Sums of a measure per category of `column` over a slice of rows."""
+        return _code_counts(self.codes[column][rows], self.values[measure][rows], self.categories[column])
+
 
 class DataLoader:
     """
     Handles data processing and transformations for the report generator.
+
+    Report queries are answered from the rollup the DataManager keeps per
+    repository (contributions by day, file type and language), so their cost
+    grows with the number of days and repositories rather than with the raw
+    history; the raw records are never loaded.
     """
 
-    def __init__(self, data_file="github_data.json"):
+    def __init__(self, data_file="github_data.json", use_snapshot=True):
         self.data_file = data_file
-        self.data = self._load_data()
-        
-        # Build and cache DataFrames for each data type.
-        self._commits_df = self._create_commits_dataframe()
-        self._prs_submitted_df = self._create_prs_submitted_dataframe()
-        self._prs_comments_df = self._create_prs_comments_dataframe()
-
-    def _load_data(self):
-        """Load the JSON file containing GitHub data."""
-        if not os.path.exists(self.data_file):
+        self.snapshot = SnapshotCache(data_file) if use_snapshot else None
+        # Bumped by refresh() whenever the data changes, so views know to redraw.
+        self.generation = 0
+        self._refresh_lock = threading.Lock()
+        # The rollup DataFrame and the last pull date of each repository in it.
+        self.repo_names = []
+        self._rollup_df = None
+        self._pull_dates = {}
+
+        if not open_storage(data_file).exists():
             raise FileNotFoundError(f"Data file '{self.data_file}' not found.")
+        self._source_stats = stat_fingerprint(data_file)
 
-        with open(self.data_file, "r") as f:
-            return json.load(f)
-
-    def _create_commits_dataframe(self):
-        """
-        Transform all commits into a single DataFrame with the following columns:
-        [repo_name, sha, date, file_path, file_type, ...].
-        """
-        rows = []
-        for repo_name, repo_data in self.data["repos"].items():
-            commits = repo_data.get("commits", [])
-            for commit in commits:
-                commit_sha = commit.get("sha")
-                commit_date_str = commit.get("date")
-                commit_date = None
-                if commit_date_str:
-                    try:
-                        commit_date = datetime.strptime(commit_date_str, "%Y-%m-%dT%H:%M:%SZ")
-                    except ValueError:
-                        pass
-
-                file_info_list = commit.get("file_info", [])
-                if not file_info_list:
-                    rows.append({
-                        "repo_name": repo_name,
-                        "sha": commit_sha,
-                        "date": commit_date,
-                        "file_path": None,
-                        "file_type": None,
-                    })
-                else:
-                    for fi in file_info_list:
-                        file_path = fi.get("file_path")
-                        if file_path:
-                            file_type = file_path.split(".")[-1] if "." in file_path else "unknown"
-                        else:
-                            file_type = None
-
-                        rows.append({
-                            "repo_name": repo_name,
-                            "sha": commit_sha,
-                            "date": commit_date,
-                            "file_path": file_path,
-                            "file_type": file_type,
-                        })
-
-        if rows:
-            return pd.DataFrame(rows)
-        else:
-            # return empty DF with consistent columns if no data
-            return pd.DataFrame(columns=["repo_name","sha","date","file_path","file_type"])
-
-    def _create_prs_submitted_dataframe(self):
-        """
-        Flatten all "pr_submitted" data into a DataFrame with columns like:
-        [repo_name, pr_id, created_at, ...].
-        """
-        rows = []
-        for repo_name, repo_data in self.data["repos"].items():
-            prs_submitted = repo_data.get("pr_submitted", [])
-            for pr in prs_submitted:
-                rows.append({
-                    "repo_name": repo_name,
-                    "pr_id": pr.get("pr_id"),
-                    "created_at": pr.get("created_at"),
-                })
-        if rows:
-            return pd.DataFrame(rows)
-        else:
-            return pd.DataFrame(columns=["repo_name","pr_id","created_at"])
-
-    def _create_prs_comments_dataframe(self):
-        """
-        Flatten all "pr_comments" data into a DataFrame with columns like:
-        [repo_name, comment_id, created_at, ...].
-        """
-        rows = []
-        for repo_name, repo_data in self.data["repos"].items():
-            pr_comments = repo_data.get("pr_comments", [])
-            for comment in pr_comments:
-                rows.append({
-                    "repo_name": repo_name,
-                    "comment_id": comment.get("comment_id"),
-                    "created_at": comment.get("created_at"),
-                })
-        if rows:
-            return pd.DataFrame(rows)
+        with METRICS.span("data_loader_init") as span:
+            span["data_file"] = data_file
+            self._load_rollup()
+
+        # Date-sorted indexes over the rollup, across and per repo, and daily
+        # activity per repo, built on first use.
+        self._date_index = None
+        self._repo_index = None
+        self._repo_codes = None
+        self._daily_activity = {}
+
+    def _load_rollup(self):
+        """
+        Reuse the columnar snapshot while the store is unchanged; otherwise
+        build the rollup DataFrame and snapshot it.
+
+        Report processes serving the same data file share the snapshot, so
+        after a sync only the first one to notice rebuilds the rollup.
+        """
+        cached = None
+        if self.snapshot and self.snapshot.available:
+            with METRICS.span("data_loader_rollup", source="snapshot"):
+                cached = self.snapshot.load()
+        if cached and cached[1].get("version") != FRAMES_VERSION:
+            cached = None
+        if cached:
+            frames, extra = cached
+            self.repo_names = extra["repo_names"]
+            self._pull_dates = extra["pull_dates"]
+            self._rollup_df = frames["rollup"]
         else:
-            return pd.DataFrame(columns=["repo_name","comment_id","created_at"])
+            self._build_rollup()
 
-    def get_overall_metrics(self):
-        """Aggregate metrics for all repositories."""
-        total_commits = len(self._commits_df)
-        total_prs_submitted = len(self._prs_submitted_df)
-        total_prs_comments = len(self._prs_comments_df)
+    def _build_rollup(self):
+        """
+        Build the rollup DataFrame from the store and snapshot it.
 
-        return {
-            "total_commits": total_commits,
-            "total_prs_submitted": total_prs_submitted,
-            "total_prs_comments": total_prs_comments,
+        Once a rollup is loaded, only the repositories whose last pull date
+        changed are read and converted again; the rows of the others are
+        carried over from the current DataFrame.
+        """
+        fingerprint = self.snapshot.capture() if self.snapshot and self.snapshot.available else None
+        with METRICS.span("data_loader_rollup", source="store") as span:
+            data = open_storage(self.data_file).load_rollup(known=self._pull_dates)
+            previous, previous_names = self._rollup_df, self.repo_names
+            self.repo_names = list(data["repos"])
+            self._pull_dates = {name: repo_data["last_pull_date"] for name, repo_data in data["repos"].items()}
+            rollups = {name: repo_data["rollup"] for name, repo_data in data["repos"].items()}
+            if any(rollup is None for rollup in rollups.values()):
+                self._rollup_df = self._splice_rollup(previous, previous_names, rollups)
+            else:
+                self._rollup_df = self._create_rollup_dataframe(rollups)
+            span.update(rows=len(self._rollup_df), reloaded=sum(rollup is not None for rollup in rollups.values()))
+        if fingerprint:
+            self.snapshot.save(
+                fingerprint,
+                {"rollup": self._rollup_df},
+                {"repo_names": self.repo_names, "pull_dates": self._pull_dates, "version": FRAMES_VERSION},
+            )
+
+    def refresh(self):
+        """
+        Pick up changes to the data store while the report is running.
+
+        Checks the store's size and mtime, and when they changed takes the
+        rollup from the snapshot if another process already refreshed it, or
+        else reloads the rollups of the repositories synced since, see
+        _build_rollup. Returns True when the data changed.
+        """
+        with self._refresh_lock:
+            stats = stat_fingerprint(self.data_file)
+            if stats == self._source_stats:
+                return False
+            self._source_stats = stats
+            self._load_rollup()
+            self._date_index = None
+            self._repo_index = None
+            self._repo_codes = None
+            self._daily_activity = {}
+            self.generation += 1
+            return True
+
+    def _create_rollup_dataframe(self, rollups):
+        """
+        Flatten the rollups of repositories, given as {repo_name: rows}, into a DataFrame with columns:
+        [repo_name, day, file_type, language, <measures>, last_commit_at].
+        """
+        counts, rows = {}, []
+        for repo_name, rollup in rollups.items():
+            counts[repo_name] = len(rollup)
+            rows.extend(rollup)
+        columns = dict(zip(ROLLUP_COLUMNS, zip(*rows))) if rows else {column: () for column in ROLLUP_COLUMNS}
+
+        frame = {
+            "repo_name": self._repo_column(counts),
+            "day": pd.DatetimeIndex(np.array(
+                [day or "NaT" for day in columns["day"]], dtype="datetime64[D]"
+            ).astype("datetime64[s]")),
+            "file_type": pd.Categorical(columns["file_type"]),
+            "language": pd.Categorical(columns["language"]),
         }
+        for measure in MEASURES:
+            frame[measure] = np.asarray(columns[measure], dtype=np.int64)
+        frame["last_commit_at"] = _parse_dates(columns["last_commit_at"])
+        return pd.DataFrame(frame)
 
-    def get_file_type_breakdown(self):
-        """Calculate the breakdown of file types across all repositories."""
-        if self._commits_df.empty:
-            return {}
-        breakdown_series = self._commits_df["file_type"].value_counts(dropna=False)
-        return breakdown_series.to_dict()
+    def _splice_rollup(self, previous, previous_names, rollups):
+        """The rollup DataFrame with the repositories whose rollup in `rollups` is None taken from `previous`."""
+        reused = [code for code, name in enumerate(previous_names) if rollups.get(name, ()) is None]
+        pieces = [previous[np.isin(np.asarray(previous["repo_name"].cat.codes), reused)]]
+        fresh = {name: rollup for name, rollup in rollups.items() if rollup is not None}
+        if fresh:
+            pieces.append(self._create_rollup_dataframe(fresh))
 
-    def get_repo_specific_metrics(self, repo_name):
-        """Retrieve metrics for a specific repository."""
-        if repo_name not in self.data["repos"]:
-            raise ValueError(f"Repository '{repo_name}' not found in data.")
+        frame = {}
+        for column in previous.columns:
+            if isinstance(previous[column].dtype, pd.CategoricalDtype):
+                frame[column] = union_categoricals([piece[column] for piece in pieces])
+            else:
+                frame[column] = np.concatenate([piece[column].to_numpy() for piece in pieces])
+        frame["repo_name"] = frame["repo_name"].set_categories(self.repo_names)
+        # Back in repository order, as a full build lays them out.
+        order = np.argsort(frame["repo_name"].codes, kind="stable")
+        return pd.DataFrame(frame).take(order).reset_index(drop=True)
+
+    def _repo_column(self, counts_per_repo):
+        """A categorical repo_name column for rows grouped by repository, from {repo_name: row count}."""
+        repo_code_of = {repo_name: code for code, repo_name in enumerate(self.repo_names)}
+        codes = np.repeat([repo_code_of[repo_name] for repo_name in counts_per_repo], list(counts_per_repo.values()))
+        return pd.Categorical.from_codes(codes.astype(np.int64), categories=self.repo_names)
 
-        # Filter commits by repo
-        repo_commits = self._commits_df[self._commits_df["repo_name"] == repo_name]
-        repo_prs_submitted = self._prs_submitted_df[self._prs_submitted_df["repo_name"] == repo_name]
-        repo_prs_comments = self._prs_comments_df[self._prs_comments_df["repo_name"] == repo_name]
+    def _get_date_index(self):
+        """The date-sorted index of the rollup, built on first use."""
+        if self._date_index is None:
+            with METRICS.span("data_loader_index", index="date"):
+                self._date_index = DateIndex(
+                    self._rollup_df, "day", ["repo_name", "file_type", "language"], [*MEASURES, "last_commit_at"]
+                )
+        return self._date_index
 
-        total_commits = len(repo_commits)
-        total_prs_submitted = len(repo_prs_submitted)
-        total_prs_comments = len(repo_prs_comments)
-        file_types = self.get_file_type_breakdown_by_repo(repo_name)
+    def _get_repo_index(self):
+        """
+        The rollup grouped by repository and sorted by date within each, built on first use.
+
+        One pass over the rollup serves every repository tab: a repository's
+        rows are found by its code, without scanning anyone else's.
+        """
+        if self._repo_index is None:
+            with METRICS.span("data_loader_index", index="repo"):
+                self._repo_index = DateIndex(
+                    self._rollup_df, "day", ["file_type"], list(MEASURES), group_column="repo_name"
+                )
+        return self._repo_index
+
+    def _window(self, start, end):
+        """The rollup index with the slice of its rows in [start, end)."""
+        index = self._get_date_index()
+        return index, index.window(start, end)
+
+    def _repo_window(self, repo_name, start, end):
+        """The per-repo index with the slice of a repository's rows in [start, end)."""
+        index = self._get_repo_index()
+        return index, index.window(start, end, self._repo_code(repo_name))
+
+    def _repo_code(self, repo_name):
+        if self._repo_codes is None:
+            self._repo_codes = {name: code for code, name in enumerate(self.repo_names)}
+        if repo_name not in self._repo_codes:
+            raise ValueError(f"Repository '{repo_name}' not found in data.")
+        return self._repo_codes[repo_name]
 
+    @METRICS.timed("data_loader_query")
+    def get_overall_metrics(self, start=None, end=None):
+        """
+        Aggregate metrics for all repositories.
+
+        Like every query below, `start` and `end` optionally limit it to the
+        activity on the days in [start, end). Total commits count touched
+        files, as they always have.
+        """
+        index, rows = self._window(start, end)
         return {
-            "total_commits": total_commits,
-            "total_prs_submitted": total_prs_submitted,
-            "total_prs_comments": total_prs_comments,
-            "file_types": file_types,
+            "total_commits": index.total("files", rows),
+            "total_prs_submitted": index.total("prs", rows),
+            "total_prs_comments": index.total("comments", rows),
         }
 
-    def get_file_type_breakdown_by_repo(self, repo_name):
-        """Calculate the breakdown of file types for a specific repository."""
-        if repo_name not in self.data["repos"]:
-            raise ValueError(f"Repository '{repo_name}' not found in data.")
+    @METRICS.timed("data_loader_query")
+    def get_file_type_breakdown(self, start=None, end=None):
+        """Calculate the breakdown of file types across all repositories."""
+        index, rows = self._window(start, end)
+        return index.counts("file_type", "files", rows)
 
-        repo_commits = self._commits_df[self._commits_df["repo_name"] == repo_name]
-        if repo_commits.empty:
-            return {}
+    @METRICS.timed("data_loader_query")
+    def get_repo_specific_metrics(self, repo_name, start=None, end=None):
+        """Retrieve metrics for a specific repository."""
+        index, rows = self._repo_window(repo_name, start, end)
+        return {
+            "total_commits": index.total("files", rows),
+            "total_prs_submitted": index.total("prs", rows),
+            "total_prs_comments": index.total("comments", rows),
+            "file_types": index.counts("file_type", "files", rows),
+        }
 
-        breakdown_series = repo_commits["file_type"].value_counts(dropna=False)
-        return breakdown_series.to_dict()
+    @METRICS.timed("data_loader_query")
+    def get_file_type_breakdown_by_repo(self, repo_name, start=None, end=None):
+        """Calculate the breakdown of file types for a specific repository."""
+        index, rows = self._repo_window(repo_name, start, end)
+        return index.counts("file_type", "files", rows)
     
-    def get_top_languages(self, n=5):
+    @METRICS.timed("data_loader_query")
+    def get_top_languages(self, n=5, start=None, end=None):
         """Get the top N languages by file type contributions across all repositories."""
-        if self._commits_df.empty:
-            return {}
+        index, rows = self._window(start, end)
+        language_counts = index.counts("language", "files", rows)
+        language_counts.pop("unknown", None)
+        language_counts.pop(np.nan, None)
+        return dict(list(language_counts.items())[:n])
 
-        language_series = self._commits_df["file_type"].apply(
-            lambda ft: EXTENSION_TO_LANGUAGE.get(ft, ft)
-        )
 
-        language_series = language_series[language_series != "unknown"]
+    @METRICS.timed("data_loader_query")
+    def get_repo_contributions_summary(self, start=None, end=None):
+        """Get a summary of contributions for each repository."""
+        index, rows = self._window(start, end)
+        repo_codes = index.codes["repo_name"][rows]
 
-        language_counts = language_series.value_counts()
-        return language_counts.head(n).to_dict()
+        # NaT is the smallest datetime64, so the maximum skips cells without commits.
+        last_commit_at = index.values["last_commit_at"][rows]
+        last_dates = np.full(len(self.repo_names), np.datetime64("NaT"), dtype=last_commit_at.dtype)
+        np.maximum.at(last_dates.view(np.int64), repo_codes, last_commit_at.view(np.int64))
 
+        return pd.DataFrame({
+            "Repository Name": self.repo_names,
+            "Total Commits": np.bincount(
+                repo_codes, weights=index.values["files"][rows], minlength=len(self.repo_names)
+            ).astype(np.int64),
+            "Total PRs": np.bincount(
+                repo_codes, weights=index.values["prs"][rows], minlength=len(self.repo_names)
+            ).astype(np.int64),
+            "Last Contribution Date": last_dates,
+        })
 
-    def get_repo_contributions_summary(self):
-        """Get a summary of contributions for each repository."""
-        summary = []
-        for repo_name, repo_data in self.data["repos"].items():
-            total_commits = len(self._commits_df[self._commits_df["repo_name"] == repo_name])
-            total_prs = len(self._prs_submitted_df[self._prs_submitted_df["repo_name"] == repo_name])
-            last_commit_date = (
-                self._commits_df[self._commits_df["repo_name"] == repo_name]["date"].max()
-            )
-            summary.append({
-                "Repository Name": repo_name,
-                "Total Commits": total_commits,
-                "Total PRs": total_prs,
-                "Last Contribution Date": last_commit_date,
-            })
-
-        return pd.DataFrame(summary).reset_index(drop=True)
\ No newline at end of file
+    @METRICS.timed("data_loader_query")
+    def get_daily_activity(self, repo_name=None, start=None, end=None):
+        """
+        Commits per day, for all repositories or one.
+
+        Returns a Series with one entry per calendar day from the first to the
+        last day with activity in any repository, so every repository's series
+        lines up. The full series is computed once per repository as a bincount
+        over day offsets and cached; windows are slices of it.
+        """
+        repo_code = None if repo_name is None else self._repo_code(repo_name)
+        if repo_name not in self._daily_activity:
+            date_index = self._get_date_index()
+            days = date_index.dates[:date_index.dated].astype("datetime64[D]")
+            if not len(days):
+                self._daily_activity[repo_name] = pd.Series([], index=pd.DatetimeIndex([]), dtype=np.int64)
+            else:
+                index = date_index if repo_code is None else self._get_repo_index()
+                rows = index.dated_rows(repo_code)
+                counts = np.bincount(
+                    (index.dates[rows].astype("datetime64[D]") - days[0]).astype(np.int64),
+                    weights=index.values["commits"][rows],
+                    minlength=int((days[-1] - days[0]).astype(np.int64)) + 1,
+                ).astype(np.int64)
+                self._daily_activity[repo_name] = pd.Series(
+                    counts, index=pd.DatetimeIndex(np.arange(days[0], days[-1] + 1).astype("datetime64[s]"))
+                )
+
+        activity = self._daily_activity[repo_name]
+        lo = 0 if start is None else activity.index.searchsorted(pd.Timestamp(start))
+        hi = len(activity) if end is None else activity.index.searchsorted(pd.Timestamp(end))
+        return activity.iloc[lo:hi]
@@ -0,0 +1,134 @@
+# exporter.py
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import panel as pn
+
+from .data_loader import DATE_FORMAT, DataLoader
+from .report_view import ReportView
+
+# One DataLoader per data file and worker process, reused across the sections it renders.
+_loaders = {}
+
+
+def _get_loader(data_file):
+    if data_file not in _loaders:
+        _loaders[data_file] = DataLoader(data_file)
+    return _loaders[data_file]
+
+
+def _page_name(repo_name):
+    """The file name of a repository's page, with the owner/name slash made file-safe."""
+    return f"{repo_name.replace('/', '__')}.html"
+
+
+def _activity_json(activity):
+    """Daily activity as its first day and the counts that follow it."""
+    if activity.empty:
+        return {"start": None, "counts": []}
+    return {"start": activity.index[0].strftime("%Y-%m-%d"), "counts": activity.tolist()}
+
+
+def _general_json(data_file):
+    data_loader = _get_loader(data_file)
+    summary = data_loader.get_repo_contributions_summary()
+    summary["Last Contribution Date"] = summary["Last Contribution Date"].dt.strftime(DATE_FORMAT)
+    return {
+        **data_loader.get_overall_metrics(),
+        "file_types": data_loader.get_file_type_breakdown(),
+        "top_languages": data_loader.get_top_languages(),
+        "repositories": summary.astype(object).where(summary.notna(), None).to_dict("records"),
+        "daily_activity": _activity_json(data_loader.get_daily_activity()),
+    }
+
+
+def _repo_json(data_file, repo_name):
+    data_loader = _get_loader(data_file)
+    return {
+        **data_loader.get_repo_specific_metrics(repo_name),
+        "daily_activity": _activity_json(data_loader.get_daily_activity(repo_name)),
+    }
+
+
+def _save_html(layout, path, title):
+    layout.save(path, title=title, resources="inline")
+    return path
+
+
+def _render_section(data_file, output_dir, fmt, repo_name):
+    """
+    Render one section of a data file's report: the general report for
+    `repo_name` None, otherwise that repository. Runs in a worker process.
+
+    HTML sections are written as self-contained pages and their path is
+    returned; JSON sections are returned as dicts.
+    """
+    if fmt == "json":
+        return _general_json(data_file) if repo_name is None else _repo_json(data_file, repo_name)
+
+    report_view = ReportView(_get_loader(data_file))
+    if repo_name is None:
+        links = "\n".join(
+            f"- [{name}]({_page_name(name)})" for name in report_view.data_loader.repo_names
+        )
+        layout = pn.Column(report_view.create_general_report(), pn.pane.Markdown(f"### Repositories\n{links}"))
+        return _save_html(layout, os.path.join(output_dir, "index.html"), "GitHub Contribution Tracker")
+    return _save_html(
+        report_view.create_repo_report(repo_name), os.path.join(output_dir, _page_name(repo_name)), repo_name
+    )
+
+
+def export_reports(data_files, output_dir, fmt="html", max_workers=None):
+    """
+    Export the reports of several data files without starting a server.
+
+    Each data file gets its own directory under `output_dir`, named after the
+    file. For "html" it holds an index.html with the general report and one
+    self-contained page per repository; for "json" a single report.json. All
+    sections of all files are rendered across one process pool. Returns the
+    written paths.
+    """
+    jobs = []
+    for data_file in data_files:
+        report_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(data_file))[0])
+        os.makedirs(report_dir, exist_ok=True)
+        # Loading here also writes the snapshot the workers then map.
+        repo_names = _get_loader(data_file).repo_names
+        jobs.append((data_file, report_dir, [None, *repo_names]))
+
+    written = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = [
+            (data_file, report_dir, sections, [
+                pool.submit(_render_section, data_file, report_dir, fmt, repo_name) for repo_name in sections
+            ])
+            for data_file, report_dir, sections in jobs
+        ]
+        for data_file, report_dir, sections, futures in pending:
+            results = [future.result() for future in futures]
+            if fmt == "json":
+                path = os.path.join(report_dir, "report.json")
+                with open(path, "w") as f:
+                    json.dump({"general": results[0], "repos": dict(zip(sections[1:], results[1:]))}, f, indent=4)
+                written.append(path)
+            else:
+                written.extend(results)
+            print(f"Exported the report for '{data_file}' to '{report_dir}'.")
+    return written
+
+
+def export_report(data_file, output_dir, fmt="html", max_workers=None):
+    """Export the report of a single data file, see export_reports."""
+    return export_reports([data_file], output_dir, fmt, max_workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export GitHub tracker reports as static HTML or JSON.")
+    parser.add_argument("data_files", nargs="+", help="data files to report on, e.g. github_data.json")
+    parser.add_argument("-o", "--output-dir", default="reports", help="directory to write the reports to")
+    parser.add_argument("--format", choices=("html", "json"), default="html")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    export_reports(args.data_files, args.output_dir, args.format, args.workers)
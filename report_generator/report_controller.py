@@ -6,19 +6,38 @@ class ReportController:
     """
     Orchestrates the data and view layers to build and serve the report application.
     """
-    def __init__(self, data_file="github_data.json"):
+    def __init__(self, data_file="github_data.json", max_rendered_tabs=None, diagnostics=False):
         self.data_loader = DataLoader(data_file)
-        self.report_view = ReportView(self.data_loader)
+        self.max_rendered_tabs = max_rendered_tabs
+        self.diagnostics = diagnostics
+        self.report_view = ReportView(self.data_loader, max_rendered_tabs, diagnostics)
 
     def build_app(self):
         """Build the Panel application."""
         return self.report_view.build_view()
 
-    def server_app(self,title, port, address="0.0.0.0"):
-        pn.extension()
-        app = self.build_app()
+    def _build_session_app(self, refresh_period):
+        """Build the application for one browser session, refreshing it as the data store changes."""
+        report_view = ReportView(self.data_loader, self.max_rendered_tabs, self.diagnostics)
+        app = report_view.build_view()
+        if refresh_period:
+            pn.state.add_periodic_callback(report_view.refresh, period=refresh_period)
+        return app
+
+    def server_app(self,title, port, address="0.0.0.0", refresh_period=5000, num_procs=1):
+        """
+        Serve the report. Every `refresh_period` milliseconds each open session
+        checks the data store and shows new data without a restart; 0 disables it.
+
+        With `num_procs` above 1 the server forks that many worker processes
+        (0 means one per CPU). They inherit the loaded data and share the
+        memory-mapped snapshot when they pick up changes, so sessions spread
+        over several cores without each worker parsing the store.
+        """
+        pn.extension("tabulator")
         pn.serve(
-            app,
+            lambda: self._build_session_app(refresh_period),
             title=title,
-            port=port
+            port=port,
+            num_procs=num_procs,
         )
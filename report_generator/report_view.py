@@ -1,70 +1,243 @@
 # report_view.py
+import io
 import panel as pn
+import holoviews as hv
 import hvplot.pandas
+import numpy as np
 import pandas as pd
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from metrics import METRICS
 
 class ReportView:
     """
     Handles the creation of the UI layout and visualizations for the report.
+
+    Repository tabs start out empty and are rendered the first time they are
+    opened. With `max_rendered_tabs` set, only that many stay rendered; the
+    least recently opened ones are emptied again and re-rendered on demand.
+
+    Every session gets its own view, but the metrics, tables and plots they
+    show are computed once per process, data generation and report period and
+    shared through `pn.state.cache`.
+
+    With `diagnostics` set, a Diagnostics tab after the General Report shows
+    the timings and counters this process has collected.
     """
-    def __init__(self, data_loader):
+    def __init__(self, data_loader, max_rendered_tabs=None, diagnostics=False):
         self.data_loader = data_loader
-        pn.extension()
+        self.max_rendered_tabs = max_rendered_tabs
+        self.diagnostics = diagnostics
+        # Panes that refresh() updates in place, filled in as the view is built.
+        # _repo_panes holds the rendered repository tabs, least recently opened first.
+        self._general_panes = {}
+        self._repo_panes = OrderedDict()
+        self._repo_tabs = {}
+        self._tab_repos = []
+        self._tabs = None
+        # Tabs in front of the repository tabs.
+        self._leading_tabs = 1
+        self._diagnostics_panes = {}
+        # The [start, end) range every metric is limited to; None means unbounded.
+        self._window = (None, None)
+        self._generation = data_loader.generation
+        pn.extension("tabulator")
 
-    def _create_general_report(self):
-        """Build the General Report view."""
-        metrics = self.data_loader.get_overall_metrics()
-        file_types = self.data_loader.get_file_type_breakdown()
-        top_n_languages = self.data_loader.get_top_languages()
-        repo_summary = self.data_loader.get_repo_contributions_summary()
+    def _shared(self, key, compute):
+        """
+        Return `compute()` cached for all sessions of this process.
 
-        metrics_table = pn.pane.Markdown(
-            f"""
+        Entries are keyed by the report period and dropped once the data
+        loader moves to a new generation. Only values that sessions can share
+        are cached: text, DataFrames and HoloViews plots, never Panel objects.
+        """
+        cache_key = ("report_view", self.data_loader.data_file)
+        cache = pn.state.cache.get(cache_key)
+        if cache is None or cache["generation"] != self.data_loader.generation:
+            cache = pn.state.cache[cache_key] = {"generation": self.data_loader.generation, "values": {}}
+        key = (*key, self._window)
+        if key not in cache["values"]:
+            with METRICS.span("report_compute", value=key[0]):
+                cache["values"][key] = compute()
+        return cache["values"][key]
+
+    def _general_metrics_text(self):
+        return self._shared(("general_metrics",), self._compute_general_metrics_text)
+
+    def _compute_general_metrics_text(self):
+        metrics = self.data_loader.get_overall_metrics(*self._window)
+        top_n_languages = self.data_loader.get_top_languages(5, *self._window)
+        return f"""
             ### General Report
             - **Total Commits**: {metrics['total_commits']}
             - **PRs Submitted**: {metrics['total_prs_submitted']}
             - **PRs Reviewed**: {metrics['total_prs_comments']}
-            
+
             ### Top Languages
             {', '.join([f'{lang}: {count}' for lang, count in top_n_languages.items()])}
-            
+
             """
-        )
 
-        file_type_plot = self._plot_file_types(file_types, title="File Type Breakdown")
-        
-        repos_summary = self._create_repo_table(repo_summary, title="Repository Contribution Summary")
+    def _general_file_types_plot(self):
+        return self._shared(("file_types",), lambda: self._plot_file_types(
+            self.data_loader.get_file_type_breakdown(*self._window), title="File Type Breakdown"
+        ))
 
-        commits_plot = self._placeholder_plot("commits heat map")
+    def _repo_summary_frame(self):
+        return self._shared(("repo_summary",), lambda: self.data_loader.get_repo_contributions_summary(*self._window))
 
-        return pn.Column(metrics_table, file_type_plot, repos_summary, commits_plot)
+    def _commit_heatmap(self, repo_name=None):
+        title = "Commit Activity" if repo_name is None else f"Commit Activity for {repo_name}"
+        return self._shared(("heatmap", repo_name), lambda: self._plot_commit_heatmap(
+            self.data_loader.get_daily_activity(repo_name, *self._window), title=title
+        ))
 
-    def _create_repo_tab(self, repo_name):
-        """Build a report view for a specific repository."""
-        repo_metrics = self.data_loader.get_repo_specific_metrics(repo_name)
+    def create_general_report(self):
+        """Build the General Report view."""
+        with METRICS.span("report_tab_build", tab="general"):
+            metrics_table = pn.pane.Markdown(self._general_metrics_text())
+
+            file_type_plot = pn.Column(self._general_file_types_plot())
+
+            repos_summary = self._create_repo_table(self._repo_summary_frame(), title="Repository Contribution Summary")
+
+            commits_plot = pn.Column(self._commit_heatmap())
 
-        metrics_table = pn.pane.Markdown(
-            f"""
+        self._general_panes.update(metrics=metrics_table, file_types=file_type_plot, heatmap=commits_plot)
+        return pn.Column(metrics_table, file_type_plot, repos_summary, commits_plot)
+
+    def _repo_metrics_text(self, repo_name, repo_metrics):
+        return f"""
             ### Report for {repo_name}
             - **Total Commits**: {repo_metrics['total_commits']}
             - **PRs Submitted**: {repo_metrics['total_prs_submitted']}
             - **PRs Reviewed**: {repo_metrics['total_prs_comments']}
             """
+
+    def _repo_metrics(self, repo_name):
+        return self._shared(
+            ("repo_metrics", repo_name), lambda: self.data_loader.get_repo_specific_metrics(repo_name, *self._window)
         )
 
-        file_type_plot = self._plot_file_types(repo_metrics['file_types'], title=f"File Type Breakdown for {repo_name}")
+    def _repo_file_types_plot(self, repo_name):
+        return self._shared(("file_types", repo_name), lambda: self._plot_file_types(
+            self._repo_metrics(repo_name)['file_types'], title=f"File Type Breakdown for {repo_name}"
+        ))
+
+    def _create_repo_tab(self, repo_name):
+        """Build the report view for a specific repository into its tab."""
+        self._repo_tabs[repo_name].objects = self.create_repo_report(repo_name).objects
+
+    def create_repo_report(self, repo_name):
+        """Build the report view for a specific repository."""
+        with METRICS.span("report_tab_build", tab="repository") as span:
+            span["repo"] = repo_name
+            repo_metrics = self._repo_metrics(repo_name)
+
+            metrics_table = pn.pane.Markdown(self._repo_metrics_text(repo_name, repo_metrics))
 
-        commits_plot = self._placeholder_plot("commits heat map")
+            file_type_plot = pn.Column(self._repo_file_types_plot(repo_name))
 
+            commits_plot = pn.Column(self._commit_heatmap(repo_name))
+
+        self._repo_panes[repo_name] = {
+            "metrics": metrics_table, "file_types": file_type_plot, "heatmap": commits_plot, "shown": self._shown_key()
+        }
         return pn.Column(metrics_table, file_type_plot, commits_plot)
-    
+
+    def _shown_key(self):
+        """What a rendered repository tab depends on besides its repository: the data generation and the window."""
+        return self.data_loader.generation, self._window
+
+    def _add_repo_tab(self, repo_name):
+        """Add an empty tab for a repository; it is rendered when first opened."""
+        self._repo_tabs[repo_name] = pn.Column(sizing_mode="stretch_width")
+        self._tab_repos.append(repo_name)
+        self._tabs.append((repo_name, self._repo_tabs[repo_name]))
+
+    def _remove_repo_tab(self, repo_name):
+        """Drop the tab of a repository that is no longer in the data, rendered or not."""
+        position = self._leading_tabs + self._tab_repos.index(repo_name)
+        active = self._tabs.active
+        self._repo_panes.pop(repo_name, None)
+        self._tab_repos.remove(repo_name)
+        self._tabs.remove(self._repo_tabs.pop(repo_name))
+        # Tabs keeps `active` as it is, which now points one tab further.
+        if active > position:
+            self._tabs.active = active - 1
+        elif active == position:
+            # The tab taking the open one's place may not be rendered, and no event says so.
+            self._tabs.active = min(active, len(self._tabs) - 1)
+            self._show_tab(self._tabs.active)
+
+    def _show_repo_tab(self, repo_name):
+        """Render a repository tab unless it already is, evicting the least recently opened ones."""
+        if repo_name in self._repo_panes:
+            self._repo_panes.move_to_end(repo_name)
+            return
+        self._create_repo_tab(repo_name)
+        if self.max_rendered_tabs:
+            while len(self._repo_panes) > self.max_rendered_tabs:
+                evicted, _ = self._repo_panes.popitem(last=False)
+                self._repo_tabs[evicted].objects = []
+
+    def _show_tab(self, index):
+        # The General Report and Diagnostics come first; the rest follow _tab_repos.
+        position = index - self._leading_tabs
+        if position >= 0:
+            self._show_repo_tab(self._tab_repos[position])
+        elif index and self.diagnostics:
+            self._update_diagnostics()
+
+    def _on_tab_change(self, event):
+        self._show_tab(event.new)
+
+    def _diagnostics_frames(self):
+        spans = pd.DataFrame(
+            METRICS.span_summary(),
+            columns=["span", "labels", "count", "total_seconds", "mean_seconds", "max_seconds"],
+        )
+        values = pd.DataFrame(METRICS.value_summary(), columns=["metric", "type", "labels", "value"])
+        return spans, values
+
+    def _create_diagnostics_tab(self):
+        """Build the Diagnostics tab: span timings and counters, with Prometheus and trace downloads."""
+        spans, values = self._diagnostics_frames()
+        span_table = pn.widgets.Tabulator(spans, disabled=True, sizing_mode="stretch_width")
+        value_table = pn.widgets.Tabulator(values, disabled=True, sizing_mode="stretch_width")
+        refresh_button = pn.widgets.Button(name="Refresh")
+        refresh_button.on_click(lambda event: self._update_diagnostics())
+        downloads = pn.Row(
+            pn.widgets.FileDownload(
+                callback=lambda: io.StringIO(METRICS.to_prometheus()), filename="metrics.prom", label="Prometheus text"
+            ),
+            pn.widgets.FileDownload(
+                callback=lambda: io.StringIO(METRICS.trace_jsonl()), filename="trace.jsonl", label="Recent trace (JSONL)"
+            ),
+        )
+        self._diagnostics_panes.update(spans=span_table, values=value_table)
+        return pn.Column(
+            pn.pane.Markdown("### Diagnostics\nTimings and counters collected by this report process."),
+            refresh_button,
+            pn.pane.Markdown("#### Spans"),
+            span_table,
+            pn.pane.Markdown("#### Counters and gauges"),
+            value_table,
+            downloads,
+        )
+
+    def _update_diagnostics(self):
+        spans, values = self._diagnostics_frames()
+        self._diagnostics_panes["spans"].value = spans
+        self._diagnostics_panes["values"].value = values
+
 
     def _plot_file_types(self, file_types, title):
         """Create an interactive bar plot for file type breakdown."""
         data = pd.DataFrame(list(file_types.items()), columns=["File Type", "Count"])
         if data.empty:
-            return pn.pane.Markdown("No file data available.")
+            # Plain text, so the result can be shared; each layout wraps it in its own pane.
+            return "No file data available."
 
         return data.hvplot.bar(
             x="File Type",
@@ -79,10 +252,28 @@ class ReportView:
             shared_axes=False,  # each plot gets independent x-/y-axes
             framewise=True      # redraw the axis range for each plot based on its own data
         )
-    
+
+    def _filter_summary(self, time_range):
+        """Filter the repository summary by the date of each repository's last contribution."""
+        repo_summary = self._repo_summary
+        now = pd.Timestamp.now()
+
+        if time_range == "Last Month":
+            start_date = now - pd.DateOffset(months=1)
+        elif time_range == "Last 6 Months":
+            start_date = now - pd.DateOffset(months=6)
+        elif time_range == "Last Year":
+            start_date = now - pd.DateOffset(years=1)
+        else:
+            return repo_summary
+
+        filtered_data = repo_summary[repo_summary["Last Contribution Date"] >= start_date]
+        return filtered_data.reset_index(drop=True)
+
     def _create_repo_table(self, repo_summary, title):
         """Create a repository contribution summary table with filters for time ranges."""
-        
+        self._repo_summary = repo_summary
+
         time_filter = pn.widgets.Select(
             name="Filter by Date",
             options=["None", "Last Month", "Last 6 Months", "Last Year"],
@@ -90,28 +281,7 @@ class ReportView:
         )
 
         def filter_table(event):
-            filtered_data = repo_summary.copy()
-            now = pd.Timestamp.now()
-
-            if event.new == "Last Month":
-                start_date = now - pd.DateOffset(months=1)
-                filtered_data = filtered_data[
-                    filtered_data["Last Contribution Date"] >= start_date
-                ]
-            elif event.new == "Last 6 Months":
-                start_date = now - pd.DateOffset(months=6)
-                filtered_data = filtered_data[
-                    filtered_data["Last Contribution Date"] >= start_date
-                ]
-            elif event.new == "Last Year":
-                start_date = now - pd.DateOffset(years=1)
-                filtered_data = filtered_data[
-                    filtered_data["Last Contribution Date"] >= start_date
-                ]
-            elif event.new == "None":
-                filtered_data = repo_summary
-
-            repo_table.value = filtered_data.reset_index(drop=True)
+            repo_table.value = self._filter_summary(event.new)
 
         time_filter.param.watch(filter_table, "value")
 
@@ -124,19 +294,117 @@ class ReportView:
 
         table_title = pn.pane.Markdown(f"### {title}")
 
+        self._general_panes.update(time_filter=time_filter, repo_table=repo_table)
         return pn.Column(table_title, time_filter, repo_table)
-    
 
-    def _placeholder_plot(self, title):
-        """Create a placeholder plot for sections not yet implemented."""
-        return pn.pane.Markdown(f"### {title}\n*(Plot not implemented yet)*")
+
+    def _plot_commit_heatmap(self, activity, title):
+        """
+        Create a calendar heatmap of daily activity: one column per week, one row per weekday.
+
+        `activity` is a daily Series from DataLoader.get_daily_activity. It is
+        padded to whole weeks and reshaped into a single image, so the plot
+        stays one glyph however many years it covers.
+        """
+        if activity.empty or not activity.any():
+            return "No commit data available."
+
+        days = activity.index.to_numpy().astype("datetime64[D]")
+        # 1970-01-01 was a Thursday; shift so that weeks start on Monday.
+        lead = int((days[0].astype(np.int64) + 3) % 7)
+        weeks = -(-(lead + len(days)) // 7)
+        grid = np.full(weeks * 7, np.nan)
+        grid[lead:lead + len(days)] = activity.to_numpy()
+        week_starts = days[0] - lead + np.arange(weeks) * 7
+
+        heatmap = hv.Image(
+            (week_starts.astype("datetime64[ns]"), np.arange(7), grid.reshape(weeks, 7).T),
+            kdims=["Week", "Weekday"],
+            vdims=["Commits"],
+        )
+        return heatmap.opts(
+            title=title,
+            cmap="Greens",
+            clipping_colors={"NaN": "white"},
+            colorbar=True,
+            invert_yaxis=True,
+            yticks=list(enumerate(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])),
+            tools=["hover"],
+            width=900,
+            height=220,
+        )
+
+    def refresh(self):
+        """
+        Reload new data from the store and push it into the existing widgets and plots.
+
+        Meant to run periodically in a served session; does nothing while the
+        store is unchanged.
+        """
+        self.data_loader.refresh()
+        if self.data_loader.generation == self._generation:
+            return
+        self._generation = self.data_loader.generation
+
+        # Repositories removed from the store lose their tab before anything queries them.
+        for repo_name in [name for name in self._tab_repos if name not in self.data_loader.repo_names]:
+            self._remove_repo_tab(repo_name)
+        self._update_panes()
+
+        # Repositories that appeared since the view was built get their own tab.
+        for repo_name in self.data_loader.repo_names:
+            if repo_name not in self._repo_tabs:
+                self._add_repo_tab(repo_name)
+
+    def _update_panes(self):
+        """Recompute the General Report and the rendered repository tabs for the current data and window."""
+        panes = self._general_panes
+        panes["metrics"].object = self._general_metrics_text()
+        panes["file_types"].objects = [self._general_file_types_plot()]
+        self._repo_summary = self._repo_summary_frame()
+        panes["repo_table"].value = self._filter_summary(panes["time_filter"].value)
+        panes["heatmap"].objects = [self._commit_heatmap()]
+
+        shown = self._shown_key()
+        for repo_name, repo_panes in self._repo_panes.items():
+            if repo_panes["shown"] == shown:
+                continue
+            repo_panes["shown"] = shown
+            repo_panes["metrics"].object = self._repo_metrics_text(repo_name, self._repo_metrics(repo_name))
+            repo_panes["file_types"].objects = [self._repo_file_types_plot(repo_name)]
+            repo_panes["heatmap"].objects = [self._commit_heatmap(repo_name)]
+
+    def _create_window_filter(self):
+        """Create the date range picker that limits the whole report to a time window."""
+        window_filter = pn.widgets.DateRangePicker(name="Report Period")
+
+        def filter_report(event):
+            if event.new:
+                start, end = event.new
+                # The picker's end day is inclusive; the queries take an exclusive end.
+                self._window = (pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1))
+            else:
+                self._window = (None, None)
+            self._update_panes()
+
+        window_filter.param.watch(filter_report, "value")
+        return window_filter
 
     def build_view(self):
-        """Build the complete Panel application view."""
-        general_report = self._create_general_report()
+        """
+        Build the complete Panel application view.
 
-        tabs = pn.Tabs(("General Report", general_report))
-        for repo_name in self.data_loader.data["repos"].keys():
-            tabs.append((repo_name, self._create_repo_tab(repo_name)))
+        Only the General Report is rendered up front; each repository tab is
+        rendered when it is first opened. A date range above the tabs limits
+        every metric to that period.
+        """
+        general_report = self.create_general_report()
 
-        return tabs
\ No newline at end of file
+        self._tabs = pn.Tabs(("General Report", general_report))
+        if self.diagnostics:
+            self._tabs.append(("Diagnostics", self._create_diagnostics_tab()))
+            self._leading_tabs = 2
+        for repo_name in self.data_loader.repo_names:
+            self._add_repo_tab(repo_name)
+        self._tabs.param.watch(self._on_tab_change, "active")
+        return pn.Column(self._create_window_filter(), self._tabs)
@@ -0,0 +1,154 @@
+# snapshot.py
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # pyarrow is optional; without it DataLoader always parses the store.
+    pa = None
+
+# Unfinished snapshot directories are left behind by crashed writers; they
+# are removed once they are this old.
+STALE_SECONDS = 3600
+
+
+def _source_files(data_file):
+    """The files whose content makes up a data store (SQLite keeps recent writes in its WAL)."""
+    return [path for path in (data_file, f"{data_file}-wal") if os.path.exists(path)]
+
+
+def stat_fingerprint(data_file):
+    """A cheap fingerprint from file sizes and modification times."""
+    return [[os.path.getsize(path), os.stat(path).st_mtime_ns] for path in _source_files(data_file)]
+
+
+def content_fingerprint(data_file):
+    """A hash of the store's content, used when the stat fingerprint changed."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in _source_files(data_file):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SnapshotCache:
+    """
+    Columnar Arrow IPC snapshot of the DataLoader's DataFrames.
+
+    Each DataFrame is written to its own Arrow file and read back
+    memory-mapped. Every save writes its frames to a fresh directory inside
+    `<data_file>.snapshot` and then points meta.json at it in one os.replace,
+    so report processes rebuilding at the same time never mix their frames
+    and readers keep the files they mapped. A snapshot is valid while the
+    content of the source store is unchanged: the file stats are compared
+    first, and only if they differ is the content hashed, so touching the
+    file does not force a rebuild.
+    """
+
+    def __init__(self, data_file, snapshot_dir=None):
+        self.data_file = data_file
+        self.snapshot_dir = snapshot_dir or f"{data_file}.snapshot"
+        self.meta_file = os.path.join(self.snapshot_dir, "meta.json")
+
+    @property
+    def available(self):
+        return pa is not None
+
+    def _frame_path(self, generation, name):
+        return os.path.join(self.snapshot_dir, generation, f"{name}.arrow")
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_file, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _valid_meta(self):
+        """The metadata of the snapshot if it still matches the source store, else None."""
+        meta = self._read_meta()
+        if meta is None or not meta.get("generation"):
+            return None
+        stats = stat_fingerprint(self.data_file)
+        if meta["stats"] == stats:
+            return meta
+        if meta["content"] != content_fingerprint(self.data_file):
+            return None
+        # Same content under new stats: remember them for the next start.
+        meta["stats"] = stats
+        self._write_meta(meta)
+        return meta
+
+    def is_valid(self):
+        """Check whether the snapshot still matches the source store."""
+        return self._valid_meta() is not None
+
+    def load(self):
+        """Return (frames, metadata) from a valid snapshot, or None."""
+        meta = self._valid_meta() if self.available else None
+        if meta is None:
+            return None
+        frames = {}
+        try:
+            for name in meta["frames"]:
+                with pa.memory_map(self._frame_path(meta["generation"], name), "r") as source:
+                    # split_blocks lets null-free numeric columns stay views of the mapped file.
+                    frames[name] = pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+        except FileNotFoundError:
+            # Replaced by a newer snapshot after meta.json was read.
+            return None
+        return frames, meta["extra"]
+
+    def capture(self):
+        """
+        Fingerprint the source store as it is now.
+
+        Take it before reading the store, so changes made while the frames
+        are being built invalidate the snapshot they end up in.
+        """
+        return {"stats": stat_fingerprint(self.data_file), "content": content_fingerprint(self.data_file)}
+
+    def save(self, fingerprint, frames, extra):
+        """Write DataFrames and JSON-serializable `extra` metadata as a snapshot of `fingerprint`."""
+        if not self.available:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix="tmp-", dir=self.snapshot_dir)
+        for name, frame in frames.items():
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            with pa.OSFile(os.path.join(tmp_dir, f"{name}.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        generation = "gen-" + os.path.basename(tmp_dir)[len("tmp-"):]
+        os.rename(tmp_dir, os.path.join(self.snapshot_dir, generation))
+        self._write_meta({**fingerprint, "generation": generation, "frames": list(frames), "extra": extra})
+        self._remove_old(generation)
+
+    def _remove_old(self, current):
+        """
+        Remove finished snapshots other than `current`, and unfinished ones left behind.
+
+        Readers keep the files they already mapped; one that read meta.json
+        just before a removal finds its files gone and rebuilds.
+        """
+        for entry in os.scandir(self.snapshot_dir):
+            if not entry.is_dir() or entry.name == current:
+                continue
+            try:
+                if entry.name.startswith("gen-") or time.time() - entry.stat().st_mtime > STALE_SECONDS:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except FileNotFoundError:
+                # Another process removed it first.
+                pass
+
+    def _write_meta(self, meta):
+        tmp_path = f"{self.meta_file}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_file)
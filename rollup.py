@@ -0,0 +1,111 @@
+EXTENSION_TO_LANGUAGE = {
+    "py": "Python",
+    "tf": "Terraform",
+    "js": "JavaScript",
+    "md": "Markdown",
+    "ts": "TypeScript",
+    "yml": "yaml",
+    "sh": "Shell Script"
+}
+
+# Bumped when the meaning of stored rollup rows changes, so stores rebuild them.
+ROLLUP_VERSION = 2
+# The additive measures of a rollup cell.
+MEASURES = ("commits", "files", "lines_added", "lines_removed", "prs", "comments")
+# Layout of a stored rollup row: the cell's dimensions, its measures, and the
+# latest commit timestamp in the cell.
+ROLLUP_COLUMNS = ("day", "file_type", "language", *MEASURES, "last_commit_at")
+_MEASURE_POSITION = {measure: position for position, measure in enumerate(ROLLUP_COLUMNS)}
+_MEASURES_SLICE = slice(_MEASURE_POSITION[MEASURES[0]], _MEASURE_POSITION[MEASURES[-1]] + 1)
+
+
+def file_type_of(file_path):
+    """The file type of a path: its extension, or "unknown" without one."""
+    if file_path is None:
+        return None
+    return file_path.rpartition(".")[2] if "." in file_path else "unknown"
+
+
+def language_of(file_type):
+    """The language a file type counts towards."""
+    return EXTENSION_TO_LANGUAGE.get(file_type, file_type)
+
+
+def day_of(timestamp):
+    """The YYYY-MM-DD day of a GitHub timestamp."""
+    return timestamp[:10] if timestamp else None
+
+
+class Rollup:
+    """
+    A repository's contributions pre-aggregated by day, file type and language.
+
+    The cells live in `rows`, the list stored with the repository, and are
+    updated in place as records are added or replaced, so reports never have
+    to go back to the raw records. Commits, PRs and comments are counted in
+    the day's cell without a file type, so each commit counts once however
+    many file types it touches; the file and line measures go to the cells
+    of the file types. Cells whose measures drop back to zero are removed.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._cells = {tuple(row[:3]): row for row in rows}
+
+    def _cell(self, day, file_type, language):
+        key = (day, file_type, language)
+        if key not in self._cells:
+            row = [day, file_type, language, *([0] * len(MEASURES)), None]
+            self._cells[key] = row
+            self.rows.append(row)
+        return self._cells[key]
+
+    def _update(self, row, position, amount):
+        row[position] += amount
+        if amount < 0 and not any(row[_MEASURES_SLICE]):
+            del self._cells[tuple(row[:3])]
+            self.rows.remove(row)
+
+    @staticmethod
+    def _stamp(row, date):
+        # Commits are immutable, so the latest timestamp never has to be taken back.
+        if date and (row[-1] is None or date > row[-1]):
+            row[-1] = date
+
+    def add(self, entity, record, sign=1):
+        """Add a record's contribution to its cells; a `sign` of -1 takes it back out."""
+        date = record.get("date")
+        day = day_of(date)
+        measure = {"commits": "commits", "pr_submitted": "prs", "pr_comments": "comments"}[entity]
+        row = self._cell(day, None, None)
+        if entity == "commits" and sign > 0:
+            self._stamp(row, date)
+        self._update(row, _MEASURE_POSITION[measure], sign)
+        if entity != "commits":
+            return
+
+        per_type = {}
+        # A commit without file details still counts as one file row of no type.
+        for file_info in record.get("file_info") or [{}]:
+            file_type = file_type_of(file_info.get("file_path"))
+            totals = per_type.setdefault((file_type, language_of(file_type)), [0, 0, 0])
+            totals[0] += 1
+            totals[1] += file_info.get("lines_added") or 0
+            totals[2] += file_info.get("lines_removed") or 0
+        for (file_type, language), (files, lines_added, lines_removed) in per_type.items():
+            row = self._cell(day, file_type, language)
+            if sign > 0:
+                self._stamp(row, date)
+            row[_MEASURE_POSITION["lines_added"]] += sign * lines_added
+            row[_MEASURE_POSITION["lines_removed"]] += sign * lines_removed
+            # Files go last: a row is only pruned once all of its measures are taken back.
+            self._update(row, _MEASURE_POSITION["files"], sign * files)
+
+
+def build_rollup(repo_data):
+    """Aggregate all records of a repository into rollup rows."""
+    rollup = Rollup([])
+    for entity in ("commits", "pr_submitted", "pr_comments"):
+        for record in repo_data.get(entity, []):
+            rollup.add(entity, record)
+    return rollup.rows
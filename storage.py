@@ -0,0 +1,548 @@
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import config
+from compact import (
+    STATUSES, FileInfo, StringTable, compact_commit, compact_repo, compress_message, decode_commits,
+    decompress_message, encode_commits, pack_values, remap_statuses, repo_paths, status_mapping, unpack_values,
+)
+from rollup import ROLLUP_COLUMNS, ROLLUP_VERSION, build_rollup
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+ENTITIES = ("commits", "pr_submitted", "pr_comments")
+# Write JSON data files in the compact format: interned paths, packed file
+# records, no indentation. Files in the older verbose format still load.
+COMPACT_DATA_FILE = getattr(config, "COMPACT_DATA_FILE", True)
+# zlib-compress commit messages in both storage backends.
+COMPRESS_MESSAGES = getattr(config, "COMPRESS_MESSAGES", True)
+# Version of the compact JSON format, stored as "format" in the file.
+JSON_FORMAT = 2
+
+
+def comment_key(comment):
+    """Comment id, recovered from the html URL for comments stored before ids were kept."""
+    if comment.get("comment_id") is not None:
+        return comment["comment_id"]
+    anchor = comment.get("pr_url", "").rpartition("#discussion_r")[2]
+    return int(anchor) if anchor.isdigit() else comment.get("pr_url")
+
+
+def _decode_repo(repo_data):
+    """Turn a repository as read from JSON into its in-memory form, with packed file records."""
+    paths = repo_paths(repo_data)
+    if isinstance(repo_data.get("commits"), dict):
+        repo_data["commits"] = decode_commits(repo_data["commits"], paths)
+    else:
+        compact_repo(repo_data)
+    return repo_data
+
+
+def _encode_repo(repo_data):
+    paths = repo_paths(repo_data)
+    encoded = {key: value for key, value in repo_data.items() if key not in ("commits", "paths")}
+    # Encoding the commits interns any paths they add, so the table is taken after.
+    encoded["commits"] = encode_commits(repo_data.get("commits", []), paths, COMPRESS_MESSAGES)
+    encoded["paths"] = paths.strings
+    return encoded
+
+
+def _verbose_repo(repo_data):
+    """A repository in the original JSON layout, with file records as dicts."""
+    verbose = {key: value for key, value in repo_data.items() if key != "paths"}
+    verbose["commits"] = [
+        {**commit, "file_info": commit["file_info"].to_dicts()} if isinstance(commit.get("file_info"), FileInfo) else commit
+        for commit in repo_data.get("commits", [])
+    ]
+    return verbose
+
+
+def _rollup_known(known, name, repo_data):
+    """Whether the caller of load_rollup already holds the current rollup of a repository."""
+    return bool(known) and repo_data.get("last_pull_date") is not None and known.get(name) == repo_data["last_pull_date"]
+
+
+def open_storage(data_file):
+    """Pick the storage backend for a data file from its extension."""
+    if data_file.endswith(SQLITE_EXTENSIONS):
+        return SQLiteStorage(data_file)
+    return JSONStorage(data_file)
+
+
+class JSONStorage:
+    """Stores all data in a single JSON file."""
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+
+    def exists(self):
+        return os.path.exists(self.data_file)
+
+    def initialize(self):
+        """Create an empty data file if it doesn't exist."""
+        if not self.exists():
+            self.save({"managed_repos": [], "repos": {}}, {})
+
+    def _read(self):
+        """The parsed file, without its format markers and with rollups of an older version dropped."""
+        with open(self.data_file, "r") as f:
+            data = json.load(f)
+        data.pop("format", None)
+        if data.pop("rollup_version", 1) != ROLLUP_VERSION:
+            for repo_data in data["repos"].values():
+                repo_data.pop("rollup", None)
+        return data
+
+    def load(self):
+        """Load the whole JSON file, in either format, with the commits' file records packed."""
+        data = self._read()
+        for repo_data in data["repos"].values():
+            _decode_repo(repo_data)
+        return data
+
+    def load_rollup(self, known=None):
+        """
+        Load the repositories with their rollups, for reports.
+
+        The JSON file can only be read whole, but only repositories saved
+        before rollups existed have their commits decoded, to build one. As
+        with SQLiteStorage, the records are left out, and `known` maps
+        repositories to the last pull date of a rollup the caller already
+        holds: while that date is unchanged, the rollup comes back as None.
+        """
+        data = self._read()
+        for name, repo_data in data["repos"].items():
+            if _rollup_known(known, name, repo_data):
+                repo_data["rollup"] = None
+            elif "rollup" not in repo_data:
+                repo_data["rollup"] = build_rollup(_decode_repo(repo_data))
+            repo_data.pop("paths", None)
+            for entity in ENTITIES:
+                repo_data[entity] = []
+        return data
+
+    def save(self, data, changes):
+        """
+        Rewrite the JSON file with `data`.
+
+        JSON cannot be updated in place, so `changes` is ignored. The file is
+        written next to the target and swapped in, so an interrupted write
+        never leaves a truncated file behind. Unless COMPACT_DATA_FILE is
+        off, commits are written column-wise with their paths interned (see
+        compact.encode_commits).
+        """
+        directory = os.path.dirname(os.path.abspath(self.data_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                if COMPACT_DATA_FILE:
+                    repos = {name: _encode_repo(repo_data) for name, repo_data in data["repos"].items()}
+                    json.dump(
+                        {**data, "format": JSON_FORMAT, "rollup_version": ROLLUP_VERSION, "repos": repos},
+                        f, separators=(",", ":"),
+                    )
+                else:
+                    repos = {name: _verbose_repo(repo_data) for name, repo_data in data["repos"].items()}
+                    json.dump({**data, "rollup_version": ROLLUP_VERSION, "repos": repos}, f, indent=4)
+            os.replace(tmp_path, self.data_file)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class SQLiteStorage:
+    """
+    Stores data in normalized SQLite tables.
+
+    Saves only write the records that changed since the last save, in one
+    transaction, so an interrupted sync leaves the previous state intact.
+    A commit's files are kept in its row as the packed values of its
+    FileInfo, referring to the repository's `paths` and the `statuses`
+    table, and messages are zlib-compressed when that makes them smaller.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS repos (
+            name TEXT PRIMARY KEY,
+            managed INTEGER NOT NULL DEFAULT 0,
+            start_date TEXT,
+            last_pull_date TEXT,
+            cursors TEXT NOT NULL DEFAULT '{}'
+        );
+        CREATE TABLE IF NOT EXISTS commits (
+            repo TEXT NOT NULL,
+            sha TEXT NOT NULL,
+            date TEXT,
+            author TEXT,
+            message TEXT,
+            files BLOB,
+            PRIMARY KEY (repo, sha)
+        );
+        CREATE INDEX IF NOT EXISTS commits_repo_date ON commits (repo, date);
+        CREATE TABLE IF NOT EXISTS paths (
+            repo TEXT NOT NULL,
+            path_id INTEGER NOT NULL,
+            path TEXT,
+            PRIMARY KEY (repo, path_id)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS statuses (
+            status_id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL UNIQUE
+        );
+        CREATE TABLE IF NOT EXISTS prs (
+            repo TEXT NOT NULL,
+            pr_id,
+            date TEXT,
+            updated_at TEXT,
+            title TEXT,
+            status TEXT,
+            PRIMARY KEY (repo, pr_id)
+        );
+        CREATE INDEX IF NOT EXISTS prs_repo_date ON prs (repo, date);
+        CREATE TABLE IF NOT EXISTS comments (
+            repo TEXT NOT NULL,
+            comment_id,
+            pr_id TEXT,
+            date TEXT,
+            updated_at TEXT,
+            comment TEXT,
+            pr_url TEXT,
+            PRIMARY KEY (repo, comment_id)
+        );
+        CREATE INDEX IF NOT EXISTS comments_repo_date ON comments (repo, date);
+        CREATE TABLE IF NOT EXISTS rollup (
+            repo TEXT NOT NULL,
+            day TEXT,
+            file_type TEXT,
+            language TEXT,
+            commits INTEGER,
+            files INTEGER,
+            lines_added INTEGER,
+            lines_removed INTEGER,
+            prs INTEGER,
+            comments INTEGER,
+            last_commit_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS rollup_repo ON rollup (repo);
+    """
+    # Bumped with schema changes that need existing data migrated, see _migrate.
+    SCHEMA_VERSION = 3
+
+    def __init__(self, data_file):
+        self.data_file = data_file
+
+    def exists(self):
+        return os.path.exists(self.data_file)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.data_file)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        if conn.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            self._migrate(conn)
+        return conn
+
+    def _migrate(self, conn):
+        """
+        Bring databases written by older versions up to SCHEMA_VERSION.
+
+        Version 1 added the rollups, version 2 moved the commit_files rows
+        into the commits' packed files, and version 3 rebuilds the rollups
+        for ROLLUP_VERSION 2, which counts each commit once per day.
+        """
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        packed = False
+        with conn:
+            if version < 2:
+                packed = self._pack_commit_files(conn)
+            if version < 3:
+                data = self._load(conn)
+                for repo, repo_data in data["repos"].items():
+                    conn.execute("DELETE FROM rollup WHERE repo = ?", (repo,))
+                    self._write_rollup(conn, repo, build_rollup(repo_data))
+            conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        if packed:
+            # Give the space of the dropped table back to the file system.
+            conn.execute("VACUUM")
+
+    def _pack_commit_files(self, conn):
+        """Move commit_files rows into the commits' packed files; returns whether there were any."""
+        if "files" not in [column[1] for column in conn.execute("PRAGMA table_info(commits)")]:
+            conn.execute("ALTER TABLE commits ADD COLUMN files BLOB")
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'commit_files'").fetchone():
+            return False
+
+        files = {}
+        for repo, sha, file_path, status, added, removed in conn.execute(
+            "SELECT repo, sha, file_path, status, lines_added, lines_removed FROM commit_files ORDER BY rowid"
+        ):
+            files.setdefault(repo, {}).setdefault(sha, []).append({
+                "file_path": file_path,
+                "status": status,
+                "lines_added": added,
+                "lines_removed": removed,
+            })
+        status_ids = self._status_ids(conn)
+        for repo, commits in files.items():
+            paths = StringTable()
+            packed = [
+                (pack_values(remap_statuses(FileInfo.from_records(records, paths).values, status_ids)), repo, sha)
+                for sha, records in commits.items()
+            ]
+            self._write_paths(conn, repo, paths)
+            conn.executemany("UPDATE commits SET files = ? WHERE repo = ? AND sha = ?", packed)
+        if COMPRESS_MESSAGES:
+            conn.executemany(
+                "UPDATE commits SET message = ? WHERE rowid = ?",
+                [
+                    (compress_message(message), rowid)
+                    for rowid, message in conn.execute("SELECT rowid, message FROM commits WHERE typeof(message) = 'text'")
+                ],
+            )
+        conn.execute("DROP TABLE commit_files")
+        return True
+
+    def initialize(self):
+        """Create the database and its tables if they don't exist."""
+        self._connect().close()
+
+    def load(self):
+        """Assemble the stored rows into the same structure the JSON file holds."""
+        conn = self._connect()
+        try:
+            data = self._load(conn)
+            self._load_rollups(conn, data)
+            return data
+        finally:
+            conn.close()
+
+    def load_rollup(self, known=None):
+        """
+        Load the repositories with their rollups, without reading any records.
+
+        Rollups of repositories whose last pull date matches `known` aren't
+        read either; they come back as None.
+        """
+        conn = self._connect()
+        try:
+            data = self._load_repos(conn)
+            changed = [name for name, repo_data in data["repos"].items() if not _rollup_known(known, name, repo_data)]
+            if len(changed) == len(data["repos"]):
+                self._load_rollups(conn, data)
+            else:
+                for name, repo_data in data["repos"].items():
+                    repo_data["rollup"] = None
+                for name in changed:
+                    data["repos"][name]["rollup"] = [
+                        list(row) for row in conn.execute(
+                            f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM rollup WHERE repo = ? ORDER BY rowid", (name,)
+                        )
+                    ]
+            return data
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _load_repos(conn):
+        data = {"managed_repos": [], "repos": {}}
+        for name, managed, start_date, last_pull_date, cursors in conn.execute(
+            "SELECT name, managed, start_date, last_pull_date, cursors FROM repos ORDER BY rowid"
+        ):
+            if managed:
+                data["managed_repos"].append(name)
+            if start_date is not None:
+                data["repos"][name] = {
+                    "start_date": start_date,
+                    "last_pull_date": last_pull_date,
+                    "cursors": json.loads(cursors),
+                    "commits": [],
+                    "pr_submitted": [],
+                    "pr_comments": [],
+                }
+        return data
+
+    @staticmethod
+    def _load_rollups(conn, data):
+        for repo_data in data["repos"].values():
+            repo_data["rollup"] = []
+        for repo, *row in conn.execute(
+            f"SELECT repo, {', '.join(ROLLUP_COLUMNS)} FROM rollup ORDER BY rowid"
+        ):
+            data["repos"][repo]["rollup"].append(row)
+
+    def _load(self, conn):
+        """The repositories and their records, without rollups."""
+        data = self._load_repos(conn)
+
+        paths = {}
+        for repo, path in conn.execute("SELECT repo, path FROM paths ORDER BY repo, path_id"):
+            paths.setdefault(repo, []).append(path)
+        for repo, repo_data in data["repos"].items():
+            repo_data["paths"] = StringTable(paths.get(repo, ()))
+        mapping = status_mapping([status for status, in conn.execute("SELECT status FROM statuses ORDER BY status_id")])
+        for repo, sha, date, author, message, files in conn.execute(
+            "SELECT repo, sha, date, author, message, files FROM commits ORDER BY rowid"
+        ):
+            repo_data = data["repos"][repo]
+            repo_data["commits"].append({
+                "sha": sha,
+                "date": date,
+                "author": author,
+                "message": decompress_message(message),
+                "file_info": FileInfo(repo_data["paths"], remap_statuses(unpack_values(files), mapping)),
+            })
+        for repo, pr_id, date, updated_at, title, status in conn.execute(
+            "SELECT repo, pr_id, date, updated_at, title, status FROM prs ORDER BY rowid"
+        ):
+            data["repos"][repo]["pr_submitted"].append({
+                "pr_id": pr_id,
+                "date": date,
+                "updated_at": updated_at,
+                "title": title,
+                "status": status,
+            })
+        for repo, comment_id, pr_id, date, updated_at, comment, pr_url in conn.execute(
+            "SELECT repo, comment_id, pr_id, date, updated_at, comment, pr_url FROM comments ORDER BY rowid"
+        ):
+            data["repos"][repo]["pr_comments"].append({
+                "comment_id": comment_id,
+                "pr_id": pr_id,
+                "date": date,
+                "updated_at": updated_at,
+                "comment": comment,
+                "pr_url": pr_url,
+            })
+        return data
+
+    def save(self, data, changes):
+        """
+        Write the changes since the last save in a single transaction.
+
+        `changes` maps repository names to {"reset": bool, entity: [records]}
+        as collected by DataManager. Repository metadata is always written,
+        and the rollups of the changed repositories are replaced.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                managed = set(data["managed_repos"])
+                # Managed repositories first, then the rest, both in their stored order:
+                # loads read them back by rowid.
+                for name in dict.fromkeys([*data["managed_repos"], *data["repos"]]):
+                    repo_data = data["repos"].get(name, {})
+                    conn.execute(
+                        """
+                        INSERT INTO repos (name, managed, start_date, last_pull_date, cursors)
+                        VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT (name) DO UPDATE SET
+                            managed = excluded.managed,
+                            start_date = excluded.start_date,
+                            last_pull_date = excluded.last_pull_date,
+                            cursors = excluded.cursors
+                        """,
+                        (
+                            name,
+                            int(name in managed),
+                            repo_data.get("start_date"),
+                            repo_data.get("last_pull_date"),
+                            json.dumps(repo_data.get("cursors", {})),
+                        ),
+                    )
+                status_ids = self._status_ids(conn)
+                for repo, repo_changes in changes.items():
+                    repo_data = data["repos"].get(repo, {})
+                    self._write_repo_changes(conn, repo, repo_changes, repo_paths(repo_data), status_ids)
+                    # A repository's rollup is small, so it is rewritten whole.
+                    conn.execute("DELETE FROM rollup WHERE repo = ?", (repo,))
+                    rollup = repo_data["rollup"] if "rollup" in repo_data else build_rollup(repo_data)
+                    self._write_rollup(conn, repo, rollup)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write_rollup(conn, repo, rows):
+        conn.executemany(
+            f"INSERT INTO rollup (repo, {', '.join(ROLLUP_COLUMNS)}) VALUES (?{', ?' * len(ROLLUP_COLUMNS)})",
+            [(repo, *row) for row in rows],
+        )
+
+    @staticmethod
+    def _status_ids(conn):
+        """Map STATUSES numbers to the database's status ids, adding the statuses it lacks; None if they match."""
+        stored = StringTable(status for status, in conn.execute("SELECT status FROM statuses ORDER BY status_id"))
+        count = len(stored)
+        ids = [stored.index(status) for status in STATUSES.strings]
+        conn.executemany(
+            "INSERT INTO statuses (status_id, status) VALUES (?, ?)",
+            [(status_id, stored.strings[status_id]) for status_id in range(count, len(stored))],
+        )
+        return None if ids == list(range(len(ids))) else ids
+
+    @staticmethod
+    def _write_paths(conn, repo, paths):
+        """Insert the paths of a repository's table that aren't stored yet; the table only grows."""
+        count = conn.execute("SELECT COUNT(*) FROM paths WHERE repo = ?", (repo,)).fetchone()[0]
+        conn.executemany(
+            "INSERT INTO paths (repo, path_id, path) VALUES (?, ?, ?)",
+            [(repo, path_id, paths.strings[path_id]) for path_id in range(count, len(paths))],
+        )
+
+    def _write_repo_changes(self, conn, repo, repo_changes, paths, status_ids):
+        if repo_changes.get("reset"):
+            for table in ("commits", "paths", "prs", "comments"):
+                conn.execute(f"DELETE FROM {table} WHERE repo = ?", (repo,))
+
+        commits = [compact_commit(commit, paths) for commit in repo_changes.get("commits", [])]
+        self._write_paths(conn, repo, paths)
+        conn.executemany(
+            "INSERT OR REPLACE INTO commits (repo, sha, date, author, message, files) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    repo,
+                    commit["sha"],
+                    commit.get("date"),
+                    commit.get("author"),
+                    compress_message(commit.get("message")) if COMPRESS_MESSAGES else commit.get("message"),
+                    pack_values(remap_statuses(commit["file_info"].values, status_ids)),
+                )
+                for commit in commits
+            ],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO prs (repo, pr_id, date, updated_at, title, status) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (repo, pr["pr_id"], pr.get("date"), pr.get("updated_at"), pr.get("title"), pr.get("status"))
+                for pr in repo_changes.get("pr_submitted", [])
+            ],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO comments (repo, comment_id, pr_id, date, updated_at, comment, pr_url) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (repo, comment_key(c), c.get("pr_id"), c.get("date"), c.get("updated_at"), c.get("comment"), c.get("pr_url"))
+                for c in repo_changes.get("pr_comments", [])
+            ],
+        )
+
+
+def full_changes(data):
+    """Describe every record in `data` as a change, to write a whole data set at once."""
+    return {
+        repo: {"reset": True, **{entity: repo_data.get(entity, []) for entity in ENTITIES}}
+        for repo, repo_data in data["repos"].items()
+    }
+
+
+def migrate_json_to_sqlite(json_file, db_file):
+    """Copy an existing JSON data file into a SQLite database."""
+    data = JSONStorage(json_file).load()
+    SQLiteStorage(db_file).save(data, full_changes(data))
+    print(f"Migrated {len(data['repos'])} repositories from '{json_file}' to '{db_file}'.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate GitHub tracker data from JSON to SQLite.")
+    parser.add_argument("json_file", help="existing JSON data file, e.g. github_data.json")
+    parser.add_argument("db_file", help="SQLite database to create, e.g. github_data.db")
+    args = parser.parse_args()
+    migrate_json_to_sqlite(args.json_file, args.db_file)
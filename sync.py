@@ -0,0 +1,252 @@
+import heapq
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import config
+from data_manager import DataManager
+from fetch_data import GitHubDataFetcher
+from graphql_fetch import GraphQLDataFetcher
+from metrics import METRICS
+from repo_catalog import TIMESTAMP_FORMAT, RepoCatalog
+from rollup import ROLLUP_COLUMNS
+
+# Activity measures that count towards a repository's sync priority.
+_ACTIVITY_POSITIONS = [ROLLUP_COLUMNS.index(measure) for measure in ("commits", "prs", "comments")]
+
+
+def create_fetcher():
+    """Create the fetcher for the configured FETCH_BACKEND."""
+    if getattr(config, "FETCH_BACKEND", "rest") == "graphql":
+        return GraphQLDataFetcher()
+    return GitHubDataFetcher()
+
+
+def _report_errors(fetcher, repo=None):
+    """Print the fetch errors of a repository, or all remaining ones; returns whether there were any."""
+    errors = fetcher.take_errors(repo)
+    for error in errors:
+        print(error)
+    return bool(errors)
+
+
+def _store_repos_data(fetcher, manager, repo_cursors, start_dates):
+    """
+    Write the pages fetcher.fetch_repos_data yields to `manager` as they arrive.
+
+    A repository's cursors only advance once all of its requests succeeded;
+    after a failure they stay put, so the next sync fetches the same range
+    again and the upserts deduplicate what was already stored.
+    """
+    # Repositories are started in order, so new ones are stored in that order.
+    for repo in repo_cursors:
+        manager.start_repo_update(repo, start_dates[repo])
+    fetched = set()
+    for repo, entity, records in fetcher.fetch_repos_data(repo_cursors):
+        if entity is not None:
+            manager.add_repo_records(repo, entity, records)
+            fetched.add(repo)
+            continue
+        complete = not _report_errors(fetcher, repo)
+        manager.finish_repo_update(repo, complete)
+        if not complete:
+            print(f"Could not fetch all data of {repo}; the next sync fetches it again.")
+        elif repo not in fetched:
+            print(f"No changes to report for {repo} since the last update.")
+    _report_errors(fetcher)
+
+
+def sync_repos(fetcher, manager, repos, start_date=None):
+    """
+    Fetch new activity for managed repositories and save it.
+
+    Each repository resumes from its sync cursors. With a `start_date`
+    (YYYY-MM-DD) the repositories are reset instead: their data is cleared
+    and fetched again from that date.
+    """
+    repo_cursors = {}
+    repo_start_dates = {}
+    for repo in repos:
+        if start_date:
+            # Replace start date and clear repo data
+            print(f"Resetting start date for {repo} to {start_date} and clearing existing data...")
+            repo_start_dates[repo] = start_date
+            repo_cursors[repo] = {"commits": start_date}
+        else:
+            # Keep current start date, fetch only new activity
+            repo_start_dates[repo] = manager.data["repos"][repo]["start_date"]
+            print(f"Using current start date ({repo_start_dates[repo]}) for {repo}...")
+            repo_cursors[repo] = manager.get_sync_cursors(repo)
+        print(f"Fetching data for {repo} from {repo_cursors[repo]['commits']} to now...")
+
+    _store_repos_data(fetcher, manager, repo_cursors, repo_start_dates)
+    manager.save_data()
+
+
+def add_repos(fetcher, manager, start_dates):
+    """Start managing repositories and fetch each one from its start date, given as {repo: YYYY-MM-DD}."""
+    repo_cursors = {}
+    for repo, start_date in start_dates.items():
+        manager.add_managed_repo(repo)
+        print(f"Fetching data for repo: {repo} from {start_date} to now...")
+        repo_cursors[repo] = {"commits": start_date}
+
+    _store_repos_data(fetcher, manager, repo_cursors, start_dates)
+    manager.save_data()
+
+
+def recent_activity(repo_data, days=30, now=None):
+    """Commits, PRs and review comments of a repository in the last `days` days, from its rollup."""
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=days)).strftime("%Y-%m-%d")
+    return sum(
+        row[position]
+        for row in repo_data.get("rollup", [])
+        if row[0] and row[0] >= cutoff
+        for position in _ACTIVITY_POSITIONS
+    )
+
+
+class SyncDaemon:
+    """
+    Keeps managed repositories in sync on a schedule.
+
+    Each repository is re-synced after an interval that shrinks with its
+    recent activity: from `max_interval` seconds for a dormant repository down
+    to `min_interval` for a busy one, spread by +/- `jitter` so repositories
+    don't all come due together. Due repositories are synced in batches of up
+    to `batch_size`, and no batch starts while the known rate-limit budget is
+    below `min_budget`; the daemon waits for the reset instead.
+
+    The repository catalog is refreshed every round: a repository pushed to
+    since its last sync is synced right away, and archived repositories wait
+    the full `max_interval`. With a `metrics_file`, the metrics are written
+    to it in the Prometheus text format after every round. A fetcher the
+    daemon creates itself is closed when run() ends, or by close().
+    """
+
+    def __init__(self, data_file, fetcher=None, min_interval=900, max_interval=86400,
+                 jitter=0.1, batch_size=10, min_budget=500, catalog=None, metrics_file=None):
+        self.data_file = data_file
+        self.metrics_file = metrics_file
+        self._owns_fetcher = fetcher is None
+        self.fetcher = fetcher or create_fetcher()
+        self.catalog = catalog or RepoCatalog()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.min_budget = min_budget
+        # (due time, repository) pairs, earliest first.
+        self._queue = []
+        self._scheduled = set()
+        # Repository -> UTC timestamp of the start of its last sync.
+        self._synced_at = {}
+
+    def interval(self, activity):
+        """Seconds until a repository with `activity` recent contributions is synced again."""
+        interval = max(self.min_interval, self.max_interval / (1 + activity))
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule(self, repo, due):
+        heapq.heappush(self._queue, (due, repo))
+        self._scheduled.add(repo)
+
+    def _update_queue(self, manager, now):
+        """Schedule newly managed repositories right away and forget the ones no longer managed."""
+        managed = [repo for repo in manager.get_managed_repos() if repo in manager.data["repos"]]
+        for repo in managed:
+            if repo not in self._scheduled:
+                self._schedule(repo, now)
+        removed = self._scheduled - set(managed)
+        if removed:
+            self._queue = [(due, repo) for due, repo in self._queue if repo not in removed]
+            heapq.heapify(self._queue)
+            self._scheduled -= removed
+
+    def _expedite_pushed(self, now):
+        """Make repositories pushed to since their last sync due right away."""
+        try:
+            self.catalog.refresh(self.fetcher)
+        except Exception as e:
+            print(f"Error refreshing the repository catalog: {e}")
+            return
+        queue = []
+        for due, repo in self._queue:
+            record = self.catalog.get(repo)
+            pushed_at = record and record["pushed_at"]
+            if pushed_at and repo in self._synced_at and pushed_at > self._synced_at[repo]:
+                due = min(due, now)
+            queue.append((due, repo))
+        self._queue = queue
+        heapq.heapify(self._queue)
+
+    def _wait_for_budget(self):
+        """Sleep until the rate limit resets while the remaining budget is below min_budget."""
+        scheduler = self.fetcher.scheduler
+        reset = scheduler.next_reset()
+        if reset is not None and scheduler.budget() < self.min_budget:
+            wait = max(0.0, reset - time.time()) + 1
+            print(f"Rate-limit budget is low; waiting {wait:.0f}s for the reset...")
+            time.sleep(wait)
+
+    def run_once(self):
+        """
+        Sync the repositories that are due and reschedule them.
+
+        Returns the number of seconds until the next repository is due.
+        """
+        # Reload every round, so repositories added from other commands are picked up
+        # and their changes are not overwritten.
+        manager = DataManager(self.data_file)
+        now = time.time()
+        self._update_queue(manager, now)
+        self._expedite_pushed(now)
+
+        due = []
+        while self._queue and self._queue[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self._queue)[1])
+            self._scheduled.discard(due[-1])
+
+        if due:
+            self._wait_for_budget()
+            started = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+            try:
+                with METRICS.span("sync_batch") as span:
+                    span["repos"] = due
+                    sync_repos(self.fetcher, manager, due)
+            except Exception as e:
+                METRICS.inc("sync_errors")
+                print(f"Error syncing {', '.join(due)}: {e}")
+            finished = time.time()
+            for repo in due:
+                self._synced_at[repo] = started
+                record = self.catalog.get(repo)
+                if record and record["archived"]:
+                    interval = self.max_interval
+                else:
+                    interval = self.interval(recent_activity(manager.data["repos"].get(repo, {})))
+                self._schedule(repo, finished + interval)
+            METRICS.inc("synced_repos", len(due))
+        METRICS.set("sync_queue_size", len(self._queue))
+        if self.metrics_file:
+            METRICS.write_prometheus(self.metrics_file)
+
+        if not self._queue:
+            return self.min_interval
+        return max(0.0, self._queue[0][0] - time.time())
+
+    def close(self):
+        """Close the fetcher, if the daemon created it."""
+        if self._owns_fetcher:
+            self.fetcher.close()
+
+    def run(self):
+        """Sync forever; stop with Ctrl+C."""
+        print(f"Sync daemon started for '{self.data_file}'.")
+        try:
+            while True:
+                wait = self.run_once()
+                if wait:
+                    time.sleep(min(wait, self.min_interval))
+        finally:
+            self.close()
@@ -0,0 +1,12 @@
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# config.py holds each user's credentials and is not part of the repository,
+# so the tests run against a stand-in and local settings never change them.
+config = types.ModuleType("config")
+config.GITHUB_TOKEN = "test-token"
+config.GITHUB_USERNAME = "test-user"
+sys.modules["config"] = config
@@ -0,0 +1,60 @@
+from array import array
+
+import pytest
+
+from compact import (
+    STATUSES, VALUE_TYPE, FileInfo, StringTable, decode_commits, encode_commits, pack_values, remap_statuses,
+    status_mapping, unpack_values,
+)
+
+FILES = [
+    {"file_path": "src/app.py", "status": "modified", "lines_added": 3, "lines_removed": 1},
+    {"file_path": "README.md", "status": "created", "lines_added": None, "lines_removed": 0},
+    {"file_path": "src/app.py", "status": "renamed", "lines_added": 0, "lines_removed": None},
+]
+
+COMMITS = [
+    {"sha": "a1", "date": "2024-01-02T03:04:05Z", "author": "Ada", "message": "Add app\n\n" + "details " * 20,
+     "file_info": FILES},
+    {"sha": "b2", "date": "2024-01-03T00:00:00Z", "author": "Bob", "message": "", "file_info": []},
+    {"sha": "c3", "date": None, "author": "Ada", "message": None, "file_info": FILES[:1]},
+]
+
+
+def test_file_info_reads_like_the_file_dicts():
+    paths = StringTable()
+    file_info = FileInfo.from_records(FILES, paths)
+    assert file_info == FILES
+    assert [record.to_dict() for record in file_info] == FILES
+    assert file_info[-1]["status"] == "renamed"
+    assert file_info.file_paths() == ["src/app.py", "README.md", "src/app.py"]
+    # Paths are interned once per table.
+    assert paths.strings == ["src/app.py", "README.md"]
+
+
+@pytest.mark.parametrize("compress_messages", [True, False])
+def test_encode_decode_round_trip(compress_messages):
+    paths = StringTable()
+    encoded = encode_commits(COMMITS, paths, compress_messages)
+    decoded = decode_commits(encoded, StringTable(paths.strings))
+    assert decoded == COMMITS
+    assert all(isinstance(commit["file_info"], FileInfo) for commit in decoded)
+
+
+def test_statuses_stored_in_another_order_are_renumbered():
+    stored = ["renamed", "modified", "created"]
+    values = array(VALUE_TYPE, [0, 0, 1, 1, 0, 2, -1, -1, 0, -1, 0, 0])
+    remapped = remap_statuses(values, status_mapping(stored))
+    assert [STATUSES.lookup(status) for status in remapped[1::4]] == ["renamed", "created", None]
+    assert status_mapping(STATUSES.strings) is None
+
+
+def test_unknown_statuses_are_rejected():
+    with pytest.raises(ValueError):
+        FileInfo.from_records([{"file_path": "a.py", "status": "exploded"}], StringTable())
+    assert len(STATUSES) == 7
+
+
+def test_packed_values_round_trip():
+    values = array(VALUE_TYPE, [0, 1, 2**31 - 1, -1])
+    assert unpack_values(pack_values(values)) == values
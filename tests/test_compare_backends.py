@@ -0,0 +1,7 @@
+from benchmarks.compare_backends import run_comparison
+from benchmarks.synthetic import generate_data
+
+
+def test_rest_and_graphql_fetch_the_same_data():
+    # Small pages and batches make both backends paginate.
+    assert run_comparison(generate_data(6, 600, seed=1), page_size=7, batch_size=2) == 0
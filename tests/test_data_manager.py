@@ -0,0 +1,86 @@
+import pytest
+
+from data_manager import DataManager
+
+
+def commit(sha, date, message="change"):
+    return {"sha": sha, "date": date, "author": "Ada", "message": message,
+            "file_info": [{"file_path": "app.py", "status": "modified", "lines_added": 1, "lines_removed": 0}]}
+
+
+def pr(pr_id, updated_at, title="PR"):
+    return {"pr_id": pr_id, "date": "2024-01-01T00:00:00Z", "updated_at": updated_at, "title": title,
+            "status": "open"}
+
+
+def comment(comment_id, updated_at):
+    return {"comment_id": comment_id, "pr_id": "1", "date": "2024-01-01T00:00:00Z", "updated_at": updated_at,
+            "comment": "LGTM", "pr_url": "https://example.com"}
+
+
+@pytest.fixture(params=["json", "db"])
+def data_file(request, tmp_path):
+    return str(tmp_path / f"github_data.{request.param}")
+
+
+def test_upserts_replace_records_and_advance_cursors(data_file):
+    manager = DataManager(data_file)
+    manager.update_repo_data(
+        "org/repo", "2024-01-01",
+        [commit("a", "2024-01-02T00:00:00Z"), commit("b", "2024-01-05T00:00:00Z")],
+        [pr(1, "2024-01-03T00:00:00Z")],
+        [comment(7, "2024-01-04T00:00:00Z")],
+    )
+    manager.update_repo_data(
+        "org/repo", "2024-01-01",
+        [commit("b", "2024-01-05T00:00:00Z", "amended"), commit("c", "2024-01-09T00:00:00Z")],
+        [pr(1, "2024-01-08T00:00:00Z", "Renamed")],
+        [comment(7, "2024-01-04T00:00:00Z")],
+    )
+    manager.save_data()
+
+    repo_data = DataManager(data_file).data["repos"]["org/repo"]
+    assert [c["sha"] for c in repo_data["commits"]] == ["a", "b", "c"]
+    assert repo_data["commits"][1]["message"] == "amended"
+    assert [p["title"] for p in repo_data["pr_submitted"]] == ["Renamed"]
+    assert len(repo_data["pr_comments"]) == 1
+    assert repo_data["cursors"] == {
+        "commits": "2024-01-09T00:00:00Z",
+        "pr_submitted": "2024-01-08T00:00:00Z",
+        "pr_comments": "2024-01-04T00:00:00Z",
+    }
+
+
+def test_incomplete_sync_stores_records_but_keeps_the_cursors(data_file):
+    manager = DataManager(data_file)
+    manager.update_repo_data("org/repo", "2024-01-01", [commit("a", "2024-01-02T00:00:00Z")], [], [])
+    cursors = dict(manager.get_sync_cursors("org/repo"))
+
+    manager.start_repo_update("org/repo", "2024-01-01")
+    manager.add_repo_records("org/repo", "commits", [commit("b", "2024-02-01T00:00:00Z")])
+    manager.finish_repo_update("org/repo", complete=False)
+    manager.save_data()
+
+    reloaded = DataManager(data_file)
+    assert [c["sha"] for c in reloaded.data["repos"]["org/repo"]["commits"]] == ["a", "b"]
+    assert reloaded.get_sync_cursors("org/repo") == cursors
+
+
+def test_failed_first_sync_starts_over_from_the_start_date(data_file):
+    manager = DataManager(data_file)
+    manager.start_repo_update("org/repo", "2023-06-01")
+    manager.add_repo_records("org/repo", "commits", [commit("a", "2024-01-02T00:00:00Z")])
+    manager.finish_repo_update("org/repo", complete=False)
+    assert manager.get_sync_cursors("org/repo")["commits"] == "2023-06-01"
+
+
+def test_new_start_date_clears_the_repository(data_file):
+    manager = DataManager(data_file)
+    manager.update_repo_data("org/repo", "2024-01-01", [commit("a", "2024-01-02T00:00:00Z")], [], [])
+    manager.save_data()
+    manager.update_repo_data("org/repo", "2024-03-01", [commit("b", "2024-03-02T00:00:00Z")], [], [])
+    manager.save_data()
+
+    repo_data = DataManager(data_file).data["repos"]["org/repo"]
+    assert repo_data["start_date"] == "2024-03-01"
+    assert [c["sha"] for c in repo_data["commits"]] == ["b"]
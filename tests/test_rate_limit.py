@@ -0,0 +1,27 @@
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bursts_up_to_capacity_then_paces_at_the_rate(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits == pytest.approx([0.0, 0.0, 0.1, 0.2])
+
+
+def test_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=2)
+    for _ in range(4):
+        bucket.reserve()
+    # The two tokens owed are paid back first; an idle bucket never exceeds its capacity.
+    clock[0] += 60
+    waits = [bucket.reserve() for _ in range(3)]
+    assert waits == pytest.approx([0.0, 0.0, 0.1])
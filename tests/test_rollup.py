@@ -0,0 +1,75 @@
+import random
+
+from data_manager import DataManager
+from rollup import ROLLUP_COLUMNS, Rollup, build_rollup
+
+COMMITS = ROLLUP_COLUMNS.index("commits")
+FILES = ROLLUP_COLUMNS.index("files")
+
+
+def commit(number):
+    """A commit whose date and files depend only on its sha, as GitHub's do."""
+    return {
+        "sha": f"sha{number}",
+        "date": f"2024-0{number % 3 + 1}-1{number % 4}T00:00:00Z",
+        "author": "Ada",
+        "message": "change",
+        "file_info": [
+            {"file_path": f"file{j}.{('py', 'js', 'md')[(number + j) % 3]}", "status": "modified",
+             "lines_added": number, "lines_removed": j}
+            for j in range(number % 5)
+        ],
+    }
+
+
+def pr(number, updated_at="2024-03-01T00:00:00Z"):
+    return {"pr_id": number, "date": f"2024-02-0{number % 9 + 1}T00:00:00Z", "updated_at": updated_at,
+            "title": "PR", "status": "open"}
+
+
+def cells(rows):
+    return sorted(tuple(map(str, row)) for row in rows)
+
+
+def test_commit_counts_once_per_day_however_many_file_types_it_touches():
+    rollup = Rollup([])
+    rollup.add("commits", {"sha": "a", "date": "2024-01-01T10:00:00Z", "file_info": [
+        {"file_path": "a.py", "lines_added": 2, "lines_removed": 1},
+        {"file_path": "b.js", "lines_added": 5, "lines_removed": 0},
+        {"file_path": "c.py", "lines_added": 1, "lines_removed": 1},
+    ]})
+    by_cell = {tuple(row[:3]): row for row in rollup.rows}
+    assert by_cell[("2024-01-01", None, None)][COMMITS] == 1
+    assert by_cell[("2024-01-01", "py", "Python")][FILES] == 2
+    assert by_cell[("2024-01-01", "js", "JavaScript")][FILES] == 1
+    assert sum(row[COMMITS] for row in rollup.rows) == 1
+
+
+def test_taking_a_record_back_out_removes_its_cells():
+    rollup = Rollup([])
+    rollup.add("commits", commit(4))
+    rollup.add("pr_submitted", pr(1))
+    rollup.add("commits", commit(4), sign=-1)
+    rollup.add("pr_submitted", pr(1), sign=-1)
+    assert rollup.rows == []
+
+
+def test_incremental_rollup_matches_a_rebuild(tmp_path):
+    rng = random.Random(1)
+    manager = DataManager(str(tmp_path / "github_data.json"))
+    manager.update_repo_data("org/repo", "2024-01-01", [commit(i) for i in range(40)], [pr(i) for i in range(10)], [])
+    # Re-fetched records replace their stored copies and take their old contribution back out.
+    for _ in range(5):
+        manager.update_repo_data(
+            "org/repo", None,
+            [commit(rng.randint(0, 45)) for _ in range(15)],
+            [pr(rng.randint(0, 12), "2024-04-01T00:00:00Z") for _ in range(5)],
+            [],
+        )
+    repo_data = manager.data["repos"]["org/repo"]
+    assert cells(repo_data["rollup"]) == cells(build_rollup(repo_data))
+    assert sum(row[COMMITS] for row in repo_data["rollup"]) == len(repo_data["commits"])
+
+    manager.save_data()
+    reloaded = DataManager(str(tmp_path / "github_data.json")).data["repos"]["org/repo"]
+    assert cells(reloaded["rollup"]) == cells(build_rollup(repo_data))
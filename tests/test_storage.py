@@ -0,0 +1,24 @@
+from benchmarks.synthetic import generate_data, write_data
+from data_manager import ENTITIES
+from storage import JSONStorage, SQLiteStorage, migrate_json_to_sqlite
+
+
+def test_json_to_sqlite_migration_keeps_every_record(tmp_path):
+    json_file = str(tmp_path / "github_data.json")
+    db_file = str(tmp_path / "github_data.db")
+    data = generate_data(5, 500, seed=2)
+    for repo_data in data["repos"].values():
+        repo_data["cursors"] = {"commits": "2024-12-01T00:00:00Z", "pr_submitted": "2024-11-01T00:00:00Z"}
+    write_data(data, json_file)
+
+    migrate_json_to_sqlite(json_file, db_file)
+
+    expected = JSONStorage(json_file).load()
+    migrated = SQLiteStorage(db_file).load()
+    assert migrated["managed_repos"] == expected["managed_repos"]
+    assert list(migrated["repos"]) == list(expected["repos"])
+    for name, repo_data in expected["repos"].items():
+        migrated_repo = migrated["repos"][name]
+        for field in ("start_date", "last_pull_date", "cursors", *ENTITIES):
+            assert migrated_repo[field] == repo_data[field], (name, field)
+        assert sorted(map(repr, migrated_repo["rollup"])) == sorted(map(repr, repo_data["rollup"]))
@@ -0,0 +1,110 @@
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import config
+
+HTTP_CONNECT_TIMEOUT = getattr(config, "HTTP_CONNECT_TIMEOUT", 10)
+HTTP_READ_TIMEOUT = getattr(config, "HTTP_READ_TIMEOUT", 30)
+# Retries of 5xx responses and connection errors, on top of the first attempt.
+HTTP_RETRIES = getattr(config, "HTTP_RETRIES", 3)
+
+
+class TransportError(Exception):
+    """A request that got no response, even after retrying."""
+
+
+class RequestError:
+    """
+    A failed GitHub request, kept as a result instead of printed.
+
+    `status` is the HTTP status, or None when no response arrived at all, and
+    `repo` the repository whose data is incomplete because of it, if any.
+    """
+
+    def __init__(self, description, url, status=None, message=None, repo=None):
+        self.description = description
+        self.url = url
+        self.status = status
+        self.message = message
+        self.repo = repo
+
+    @classmethod
+    def from_response(cls, description, url, response, repo=None):
+        return cls(description, url, response.status_code, error_message(response), repo)
+
+    def __str__(self):
+        return f"Failed to fetch {self.description}: {self.status or 'no response'} - {self.message}"
+
+    def __repr__(self):
+        return f"RequestError({self.description!r}, {self.url!r}, {self.status!r}, {self.message!r}, {self.repo!r})"
+
+
+def error_message(response):
+    """The message of an error response; error bodies are not always JSON."""
+    try:
+        body = response.json()
+    except ValueError:
+        return response.text[:200] or response.reason
+    if isinstance(body, dict) and body.get("message"):
+        return body["message"]
+    return response.reason
+
+
+class HTTPTransport:
+    """
+    Pooled HTTP transport for the GitHub API.
+
+    Requests share one session whose connection pool keeps up to `pool_size`
+    connections alive, so concurrent workers reuse connections instead of
+    opening one per request. Responses are requested gzip-compressed, every
+    request has connect and read timeouts, and 5xx responses and connection
+    errors are retried up to `retries` times with jittered exponential
+    backoff. Rate-limit responses are returned as they are; the fetcher's
+    scheduler decides on those.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 retries=HTTP_RETRIES, backoff=0.5, max_backoff=30.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["Accept-Encoding"] = "gzip"
+
+    def _delay(self, attempt):
+        """Full-jitter backoff: a random wait up to the doubled base delay, capped."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request and return its response, retrying server errors.
+
+        The last 5xx response is returned once the retries are used up;
+        raises TransportError when no response arrived at all.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.retries:
+                    raise TransportError(f"{type(e).__name__}: {e}") from e
+            else:
+                if response.status_code < 500 or attempt == self.retries:
+                    return response
+            time.sleep(self._delay(attempt))
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()